@@ -0,0 +1,48 @@
+import threading
+from collections import OrderedDict
+
+
+class ActiveApplications:
+
+    def __init__(self, db, capacity: int = 1000):
+        self.db = db
+        self.capacity = capacity
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, file_id, data):
+        with self._lock:
+            self._cache[file_id] = data
+            self._cache.move_to_end(file_id)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def load(self) -> int:
+        rows = self.db.get_active_applications(self.capacity)
+        for file_id, data in reversed(rows):
+            self.remember(file_id, data)
+        return len(rows)
+
+    def get(self, file_id, default=None):
+        with self._lock:
+            data = self._cache.get(file_id)
+            if data is not None:
+                self._cache.move_to_end(file_id)
+                return data
+
+        data = self.db.get_active_application(file_id)
+        if data is None:
+            return default
+        self.remember(file_id, data)
+        return data
+
+    def __contains__(self, file_id) -> bool:
+        return self.get(file_id) is not None
+
+    def pop(self, file_id, default=None):
+        with self._lock:
+            data = self._cache.pop(file_id, None)
+        if data is None:
+            data = self.db.get_active_application(file_id)
+        self.db.delete_active_application(file_id)
+        return default if data is None else data
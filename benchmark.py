@@ -0,0 +1,406 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import config
+import xlsx_reader
+from database import Database
+from excel_handler import ExcelHandler
+from file_monitor import FileMonitor
+from processed_index import ProcessedIndex
+
+ROLE_FOLDERS = ("director_folder", "findirector_folder", "accountant_folder", "cashier_folder", "rejected_folder")
+STATUSES = ("Director_confirm_form", "Financial_namager_confirm_form", "Empty_form", "Draft_form")
+PAYMENTS = ("Готівка", "Безготівка", "Карта", "Картка", "")
+
+
+def _timed(fn, repeat: int):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, samples
+
+
+def _summary(samples) -> dict:
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples) * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def _collect_files(paths) -> list:
+    files = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in (".xlsm", ".xlsx")))
+        else:
+            files.append(path)
+    return files
+
+
+def bench_parse(files, repeat: int = 5) -> list:
+    handler = ExcelHandler()
+    results = []
+
+    for file in files:
+        fast, fast_samples = _timed(lambda: xlsx_reader.read_cells(str(file), ExcelHandler.CELLS), repeat)
+        slow, slow_samples = _timed(lambda: handler._parse_openpyxl(file), repeat)
+
+        mismatches = sorted(
+            key for key in set(fast["cells"]) | set(slow["cells"])
+            if fast["cells"].get(key) != slow["cells"].get(key)
+        )
+        if fast["sheetnames"] != slow["sheetnames"]:
+            mismatches.append("sheetnames")
+
+        results.append({
+            "file": file.name,
+            "size_bytes": file.stat().st_size,
+            "fast": _summary(fast_samples),
+            "openpyxl": _summary(slow_samples),
+            "speedup": round(statistics.median(slow_samples) / statistics.median(fast_samples), 2),
+            "mismatches": mismatches,
+        })
+
+    return results
+
+
+def generate_workbooks(folder, count: int, filler_rows: int = 400, statuses=None,
+                       payments=None, extensions=(".xlsx",), prefix: str = "burst") -> list:
+    from openpyxl import Workbook
+
+    statuses = statuses or ("Director_confirm_form",)
+    payments = payments or ("Готівка", "Безготівка")
+    files = []
+    for i in range(count):
+        wb = Workbook()
+        blank = wb.active
+        blank.title = "Бланк"
+        blank["B1"] = datetime(2025, 1, 1) + timedelta(days=i % 365)
+        blank["B1"].number_format = "dd.mm.yyyy"
+        blank["E1"] = f"Заявник {i}"
+        blank["H1"] = f"Відділ {i % 7}"
+        blank["C3"] = payments[i % len(payments)] or None
+        blank["G4"] = f"ТОВ Постачальник {i % 50}"
+        blank["B10"] = 1000 + i * 13.5
+        blank["C12"] = f"Оплата за рахунком №{i}"
+        for row in range(14, 14 + filler_rows):
+            for col in range(1, 9):
+                blank.cell(row=row, column=col, value=f"r{row}c{col}")
+
+        settings = wb.create_sheet("Налаштування")
+        settings["B8"] = statuses[i % len(statuses)]
+
+        path = Path(folder) / f"{prefix}_{i:04d}{extensions[i % len(extensions)]}"
+        wb.save(path)
+        files.append(str(path))
+    return files
+
+
+def bench_burst(count: int, workers: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        files = generate_workbooks(tmp, count)
+        runs = {}
+
+        for pool_size in sorted({1, workers}):
+            handler = ExcelHandler(workers=pool_size)
+            start = time.perf_counter()
+            first = None
+            for fp in handler.prefetch(files):
+                handler.read_application(fp)
+                if first is None:
+                    first = time.perf_counter() - start
+            total = time.perf_counter() - start
+            handler.shutdown()
+
+            runs[f"workers_{pool_size}"] = {
+                "first_result_ms": round(first * 1000, 1),
+                "total_ms": round(total * 1000, 1),
+                "per_file_ms": round(total * 1000 / count, 2),
+            }
+
+    sequential = runs["workers_1"]["total_ms"]
+    parallel = runs[f"workers_{workers}"]["total_ms"]
+    return {
+        "files": count,
+        "reader": config.XLSX_READER,
+        "cpu_count": os.cpu_count(),
+        "runs": runs,
+        "speedup": round(sequential / parallel, 2) if parallel else None,
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5, cwd=Path(__file__).resolve().parent,
+        )
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _role_folders(root) -> dict:
+    paths = {}
+    for key in ROLE_FOLDERS:
+        path = Path(root) / key
+        path.mkdir(parents=True, exist_ok=True)
+        paths[key] = str(path)
+    return paths
+
+
+def bench_check_folders(monitor: FileMonitor, repeat: int = 5) -> dict:
+    def full_scan():
+        monitor._last_full_scan = 0.0
+        return monitor.check_folders()
+
+    start = time.perf_counter()
+    full_scan()
+    detect = time.perf_counter() - start
+
+    start = time.perf_counter()
+    apps = full_scan()
+    process = time.perf_counter() - start
+
+    _, warm_samples = _timed(full_scan, repeat)
+
+    return {
+        "cold_detect_ms": round(detect * 1000, 3),
+        "cold_process_ms": round(process * 1000, 3),
+        "applications": len(apps),
+        "quarantined": len(monitor.quarantine),
+        "warm_full_scan": _summary(warm_samples),
+    }
+
+
+def bench_read_application(files, repeat: int = 3) -> dict:
+    cold_samples = []
+    for fp in files:
+        handler = ExcelHandler(workers=1)
+        start = time.perf_counter()
+        handler.read_application(fp)
+        cold_samples.append(time.perf_counter() - start)
+
+    handler = ExcelHandler(workers=1)
+    for fp in files:
+        handler.read_application(fp)
+    warm_samples = []
+    for _ in range(repeat):
+        for fp in files:
+            start = time.perf_counter()
+            handler.read_application(fp)
+            warm_samples.append(time.perf_counter() - start)
+
+    return {"files": len(files), "cold": _summary(cold_samples), "cached": _summary(warm_samples)}
+
+
+def bench_move_routing(excel: ExcelHandler, paths: dict) -> dict:
+    routes = Counter()
+    excel.add_move_listener(lambda src, dst: routes.update([f"{src.parent.name} → {dst.parent.name}"]))
+
+    files = []
+    for key in ("director_folder", "findirector_folder"):
+        files.extend(sorted(str(p) for p in Path(paths[key]).iterdir() if p.suffix in (".xlsm", ".xlsx")))
+
+    samples = []
+    failed = 0
+    for i, fp in enumerate(files):
+        start = time.perf_counter()
+        if not excel.move_file(fp, approved=i % 5 != 0):
+            failed += 1
+        samples.append(time.perf_counter() - start)
+
+    return {
+        "files": len(files),
+        "failed": failed,
+        "routes": dict(sorted(routes.items())),
+        "timing": _summary(samples) if samples else None,
+    }
+
+
+def bench_db_lookups(folder, rows: int, lookups: int = 500, batch: int = 100) -> dict:
+    db = Database(db_path=str(Path(folder) / "lookups.db"))
+    now = datetime.now().isoformat()
+
+    start = time.perf_counter()
+    with db._connect() as conn:
+        conn.executemany(
+            "INSERT INTO processed_files (file_path, file_name, file_hash, processed_at, approver, status) "
+            "VALUES (?, ?, ?, ?, 'ДИРЕКТОР', 'DETECTED')",
+            (
+                (f"/archive/{i // 1000:04d}/zayavka_{i}.xlsm", f"zayavka_{i}.xlsm",
+                 Database.make_file_hash(f"/archive/{i // 1000:04d}/zayavka_{i}.xlsm", 20000 + i, 1.7e9 + i), now)
+                for i in range(rows)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO actions_log (file_name, action, user, timestamp, details) VALUES (?, 'DETECTED', 'monitor', ?, '')",
+            ((f"zayavka_{i}.xlsm", now) for i in range(rows)),
+        )
+    populate = time.perf_counter() - start
+
+    rng = random.Random(rows)
+    sample = [
+        f"/archive/{i // 1000:04d}/zayavka_{i}.xlsm" if n % 2 else f"/incoming/new_{n}.xlsm"
+        for n, i in enumerate(rng.randrange(max(rows, 1)) for _ in range(lookups))
+    ]
+    hashes = [Database.make_file_hash(fp, 1, 1.0) for fp in sample]
+
+    _, single = _timed(lambda: [db.is_file_processed(fp) for fp in sample], 1)
+    _, batched = _timed(
+        lambda: [db.get_processed_paths(sample[i:i + batch], hashes[i:i + batch])
+                 for i in range(0, len(sample), batch)],
+        3,
+    )
+
+    index = ProcessedIndex(db, capacity=max(rows, config.PROCESSED_INDEX_CAPACITY))
+    start = time.perf_counter()
+    index.warm()
+    warm = time.perf_counter() - start
+    _, filtered = _timed(lambda: index.filter_processed(sample, hashes), 3)
+
+    _, first_page = _timed(lambda: db.get_actions_page(limit=10), 5)
+    _, deep_page = _timed(lambda: db.get_actions_page(before_id=rows // 2, limit=10), 5)
+    _, counter = _timed(db.get_processed_count, 5)
+
+    db.close()
+    return {
+        "rows": rows,
+        "lookups": lookups,
+        "populate_ms": round(populate * 1000, 1),
+        "is_file_processed_per_lookup_ms": round(single[0] * 1000 / max(lookups, 1), 4),
+        "get_processed_paths_per_lookup_ms": round(statistics.median(batched) * 1000 / max(lookups, 1), 4),
+        "index_warm_ms": round(warm * 1000, 1),
+        "index_filter_per_lookup_ms": round(statistics.median(filtered) * 1000 / max(lookups, 1), 4),
+        "actions_first_page": _summary(first_page),
+        "actions_deep_page": _summary(deep_page),
+        "processed_count": _summary(counter),
+    }
+
+
+def bench_pipeline(count: int, rows: int, workers: int, filler_rows: int = 50) -> dict:
+    saved_paths = config._paths
+    saved_settle = config.FILE_SETTLE_TIME
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _role_folders(Path(tmp) / "folders")
+        config._paths = paths
+        config.FILE_SETTLE_TIME = 0
+
+        try:
+            half = count // 2
+            generate_workbooks(paths["director_folder"], count - half, filler_rows, STATUSES, PAYMENTS,
+                               extensions=(".xlsm", ".xlsx"), prefix="dir")
+            generate_workbooks(paths["findirector_folder"], half, filler_rows, STATUSES[1:], PAYMENTS,
+                               extensions=(".xlsm", ".xlsx"), prefix="fin")
+            files = [
+                str(p) for key in ("director_folder", "findirector_folder")
+                for p in sorted(Path(paths[key]).iterdir())
+            ]
+
+            excel = ExcelHandler(workers=workers)
+            monitor = FileMonitor(excel=excel, db=Database(db_path=str(Path(tmp) / "pipeline.db")))
+
+            result = {
+                "files": count,
+                "check_folders": bench_check_folders(monitor),
+                "read_application": bench_read_application(files),
+                "move_file": bench_move_routing(excel, paths),
+            }
+            monitor.shutdown()
+
+            result["db"] = bench_db_lookups(tmp, rows)
+        finally:
+            config._paths = saved_paths
+            config.FILE_SETTLE_TIME = saved_settle
+
+    return result
+
+
+def _compare(old, new, path="") -> list:
+    rows = []
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old.keys() & new.keys():
+            rows.extend(_compare(old[key], new[key], f"{path}.{key}" if path else key))
+    elif isinstance(old, (int, float)) and isinstance(new, (int, float)) and path.endswith("_ms"):
+        rows.append((path, old, new, round(new / old, 3) if old else None))
+    return rows
+
+
+def compare_results(old_file, new_file) -> list:
+    old = json.loads(Path(old_file).read_text(encoding="utf-8"))
+    new = json.loads(Path(new_file).read_text(encoding="utf-8"))
+    return [
+        {"metric": metric, "old": a, "new": b, "ratio": ratio}
+        for metric, a, b, ratio in sorted(_compare(old, new))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки обробки заявок")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parse_cmd = commands.add_parser("parse", help="xlsx_reader проти openpyxl на реальних файлах")
+    parse_cmd.add_argument("paths", nargs="+", help="файли або папки з .xlsm/.xlsx")
+    parse_cmd.add_argument("--repeat", type=int, default=5)
+
+    burst_cmd = commands.add_parser("burst", help="паралельний розбір синтетичного пакета заявок")
+    burst_cmd.add_argument("--files", type=int, default=100)
+    burst_cmd.add_argument("--workers", type=int, default=config.PARSE_WORKERS)
+
+    pipeline_cmd = commands.add_parser("pipeline", help="сканування → розбір → маршрутизація на тимчасових папках")
+    pipeline_cmd.add_argument("--files", type=int, default=200)
+    pipeline_cmd.add_argument("--rows", type=int, default=100000, help="розмір processed_files для пошуку в БД")
+    pipeline_cmd.add_argument("--workers", type=int, default=config.PARSE_WORKERS)
+    pipeline_cmd.add_argument("--filler-rows", type=int, default=50)
+
+    compare_cmd = commands.add_parser("compare", help="порівняти два JSON-результати")
+    compare_cmd.add_argument("old")
+    compare_cmd.add_argument("new")
+
+    for cmd in (parse_cmd, burst_cmd, pipeline_cmd):
+        cmd.add_argument("--output", help="також записати результат у файл")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        print(json.dumps(compare_results(args.old, args.new), ensure_ascii=False, indent=2))
+        return
+
+    if args.command == "parse":
+        result = {"parse": bench_parse(_collect_files(args.paths), args.repeat)}
+    elif args.command == "burst":
+        result = {"burst": bench_burst(args.files, args.workers)}
+    elif args.command == "pipeline":
+        result = {"pipeline": bench_pipeline(args.files, args.rows, args.workers, args.filler_rows)}
+
+    result["meta"] = {
+        "revision": _git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "reader": config.XLSX_READER,
+        "cpu_count": os.cpu_count(),
+    }
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
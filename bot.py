@@ -1,7 +1,9 @@
 # bot.py
 import asyncio
+import html
 import logging
 import hashlib
+from datetime import date, timedelta
 from aiogram import Bot, Dispatcher, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
@@ -9,11 +11,17 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramAPIError
 
 import config
-from database import Database
+import metrics
+from application_store import ActiveApplications
+from database import REPORT_GROUPS, Database, get_database
 from excel_handler import ExcelHandler
 from file_monitor import FileMonitor
+from move_queue import MoveQueue
+from notifier import NotificationQueue
+from retention import RetentionWorker
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,13 +29,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-bot = Bot(token=config.BOT_TOKEN)
 dp = Dispatcher(storage=MemoryStorage())
-db = Database()
-excel = ExcelHandler()
-monitor = FileMonitor()
+bot = None
+db = None
+excel = None
+monitor = None
+notifier = None
+active_applications = None
+moves = None
+retention = None
+
+
+def create_services():
+    global bot, db, excel, monitor, notifier, active_applications, moves, retention
+
+    bot = Bot(token=config.BOT_TOKEN)
+    db = get_database()
+    excel = ExcelHandler()
+    monitor = FileMonitor(excel=excel)
+
+    notifier = NotificationQueue(
+        bot,
+        global_rate=config.NOTIFY_GLOBAL_RATE,
+        chat_rate=config.NOTIFY_CHAT_RATE,
+        chat_burst=config.NOTIFY_CHAT_BURST,
+        group_rate=config.NOTIFY_GROUP_RATE / 60,
+    )
+    active_applications = ActiveApplications(db, capacity=config.ACTIVE_APPLICATIONS_CACHE)
+    moves = MoveQueue(db, excel, max_attempts=config.MOVE_MAX_ATTEMPTS)
+
+    retention = RetentionWorker(
+        db,
+        days=config.RETENTION_DAYS,
+        archive_path=config.ARCHIVE_DATABASE,
+        interval=config.RETENTION_INTERVAL_HOURS * 3600,
+        batch_size=config.RETENTION_BATCH,
+    )
 
-active_applications = {}
+FINAL_STAGE = "ФІНДИРЕКТОР"
+STATS_PAGE_SIZE = 10
+FIND_PAGE_SIZE = 5
+FIND_QUERIES_LIMIT = 200
+MESSAGE_LIMIT = 4000
+find_queries = {}
 
 class SettingsState(StatesGroup):
     waiting_path = State()
@@ -42,6 +86,8 @@ async def cmd_start(message: Message):
         "/status — поточний статус системи\n"
         "/settings — налаштування папок\n"
         "/stats — статистика обробки\n"
+        "/processed — оброблені файли\n"
+        "/quarantine — файли в карантині\n"
         "/help — детальна допомога",
         parse_mode=ParseMode.HTML
     )
@@ -59,12 +105,21 @@ async def cmd_help(message: Message):
         "<b>Команди:</b>\n"
         "/status — статус папок та моніторингу\n"
         "/settings — змінити шляхи до папок\n"
-        "/stats — переглянути статистику\n\n"
+        "/stats — переглянути статистику\n"
+        "/processed — журнал оброблених файлів\n"
+        "/quarantine — невалідні файли, які пропускаються до зміни\n"
+        "/metrics — час виконання етапів обробки\n"
+        "/report [період] [розріз] — суми та кількість заявок\n"
+        "/find текст — пошук заявок за постачальником, призначенням, заявником, відділом, файлом\n"
+        "/audit [файл] — підсумки журналу по місяцях або історія файлу, включно з архівом\n"
+        "   період: month, prev, 2025, 2025-03, 30d, 2025-01-01:2025-03-31\n"
+        "   розріз: department, approver, applicant, supplier, payment\n\n"
         "<b>Налаштування в .env:</b>\n"
         "BOT_TOKEN — токен бота\n"
         "CHAT_ID_FINDIRECTOR — ID чату фіндиректора\n"
         "CHAT_ID_DIRECTOR — ID чату директора\n"
-        "CHECK_INTERVAL — інтервал перевірки (секунди)"
+        "CHECK_INTERVAL — інтервал перевірки (секунди)\n"
+        "WATCHER_BACKEND — auto / inotify / polling"
     )
     await message.answer(help_text, parse_mode=ParseMode.HTML)
 
@@ -75,35 +130,363 @@ async def cmd_status(message: Message):
     
     text = "СТАТУС СИСТЕМИ\n\n"
     text += f"Остання перевірка: {stats['last_check']}\n"
-    text += f"Інтервал: {config.CHECK_INTERVAL} сек\n"
-    text += f"Оброблено всього: {len(db.get_all_processed_files())} файлів\n\n"
+    text += f"Оброблено всього: {stats['processed_total']} файлів\n\n"
     
     text += "<b>СТАТУС ПАПОК:</b>\n"
     for name, info in stats['folders'].items():
         emoji = "Активно" if info["exists"] else "Не знайдено"
         status = "активна" if info["exists"] else "не знайдена"
-        text += f"{emoji} <b>{name}</b>: {status}, файлів: {info['files']}\n"
+        files = "—" if info['files'] is None else info['files']
+        text += f"{emoji} <b>{name}</b>: {status}, файлів: {files}\n"
+
+    mode = "робочі години" if stats['business_hours'] else "неробочий час"
+    text += f"\n<b>РОЗКЛАД СКАНУВАННЯ</b> ({mode}):\n"
+    if stats['watched']:
+        text += f"Через події ФС: {stats['watched']} папок\n"
+    for item in stats['schedule']:
+        idle = "ще не було" if item['idle_for'] is None else f"{item['idle_for'] / 60:.0f} хв тому"
+        text += (f"<b>{html.escape(item['label'])}</b>: кожні {item['interval']:.0f} сек, "
+                 f"наступне через {item['next_in']:.0f} сек, активність {idle}\n")
     
     await message.answer(text, parse_mode=ParseMode.HTML)
 
 
-@dp.message(Command("stats"))
-async def cmd_stats(message: Message):
-    recent = db.get_recent_actions(20)
-    
+def _stats_view(before_id=None, after_id=None):
+    page = db.get_actions_page(before_id=before_id, after_id=after_id, limit=STATS_PAGE_SIZE)
+    items = page["items"]
+
     text = "ОСТАННЯ АКТИВНІСТЬ\n\n"
-    if not recent:
+    if not items:
         text += "Поки що заявок не оброблено"
+        return text, None
+
+    for action in items:
+        emoji = "Погоджено" if action['action'] == "APPROVED" else "Відхилено" if action['action'] == "REJECTED" else "Виявлено"
+        text += f"{emoji} <code>{html.escape(action['file_name'] or '')}</code>\n"
+        text += f"   {action['action']} by {html.escape(action['user'] or '')}\n"
+        text += f"   {action['timestamp']}\n\n"
+
+    nav = []
+    if page["has_newer"]:
+        nav.append(InlineKeyboardButton(text="« Новіші", callback_data=f"stats_newer_{items[0]['id']}"))
+    if page["has_older"]:
+        nav.append(InlineKeyboardButton(text="Старіші »", callback_data=f"stats_older_{items[-1]['id']}"))
+
+    return text, InlineKeyboardMarkup(inline_keyboard=[nav]) if nav else None
+
+
+@dp.message(Command("stats"))
+async def cmd_stats(message: Message):
+    text, kb = _stats_view()
+    await message.answer(text, reply_markup=kb, parse_mode=ParseMode.HTML)
+
+
+@dp.callback_query(F.data.startswith("stats_"))
+async def stats_page(cb: CallbackQuery):
+    direction, _, cursor = cb.data[len("stats_"):].partition("_")
+    if direction == "older":
+        text, kb = _stats_view(before_id=int(cursor))
     else:
-        for action in recent:
-            emoji = "Погоджено" if action['action'] == "APPROVED" else "Відхилено" if action['action'] == "REJECTED" else "Виявлено"
-            text += f"{emoji} <code>{action['file_name']}</code>\n"
-            text += f"   {action['action']} by {action['user']}\n"
-            text += f"   {action['timestamp']}\n\n"
-    
+        text, kb = _stats_view(after_id=int(cursor))
+
+    await cb.message.edit_text(text, reply_markup=kb, parse_mode=ParseMode.HTML)
+    await cb.answer()
+
+
+def _processed_view(before_id=None, after_id=None):
+    page = db.get_processed_files_page(before_id=before_id, after_id=after_id, limit=STATS_PAGE_SIZE)
+    items = page["items"]
+
+    text = "ОБРОБЛЕНІ ФАЙЛИ\n\n"
+    if not items:
+        text += "Поки що файлів не оброблено"
+        return text, None
+
+    for item in items:
+        text += f"<code>{html.escape(item['file_name'] or '')}</code>\n"
+        text += f"   {html.escape(item['approver'] or '—')}, {item['status']}\n"
+        text += f"   {item['processed_at']}\n\n"
+
+    nav = []
+    if page["has_newer"]:
+        nav.append(InlineKeyboardButton(text="« Новіші", callback_data=f"processed_newer_{items[0]['id']}"))
+    if page["has_older"]:
+        nav.append(InlineKeyboardButton(text="Старіші »", callback_data=f"processed_older_{items[-1]['id']}"))
+
+    return text, InlineKeyboardMarkup(inline_keyboard=[nav]) if nav else None
+
+
+@dp.message(Command("processed"))
+async def cmd_processed(message: Message):
+    text, kb = _processed_view()
+    await message.answer(text, reply_markup=kb, parse_mode=ParseMode.HTML)
+
+
+@dp.callback_query(F.data.startswith("processed_"))
+async def processed_page(cb: CallbackQuery):
+    direction, _, cursor = cb.data[len("processed_"):].partition("_")
+    if direction == "older":
+        text, kb = _processed_view(before_id=int(cursor))
+    else:
+        text, kb = _processed_view(after_id=int(cursor))
+
+    await cb.message.edit_text(text, reply_markup=kb, parse_mode=ParseMode.HTML)
+    await cb.answer()
+
+
+def _quarantine_view():
+    items = monitor.get_quarantine()
+
+    text = "КАРАНТИН ФАЙЛІВ\n\n"
+    if not items:
+        text += "Карантин порожній"
+        return text, None
+
+    text += "Ці файли пропускаються, доки їх не буде змінено:\n\n"
+    kb = []
+    for i, item in enumerate(items[:20], start=1):
+        text += f"{i}. <code>{html.escape(item['file_name'])}</code>\n"
+        text += f"   {html.escape(item['reason'] or '—')}\n"
+        text += f"   {item['quarantined_at']}\n\n"
+        if i <= 10:
+            path_id = hashlib.md5(item['file_path'].encode('utf-8')).hexdigest()
+            kb.append([InlineKeyboardButton(text=f"Звільнити {i}", callback_data=f"quarantine_del_{path_id}")])
+
+    if len(items) > 20:
+        text += f"...та ще {len(items) - 20}\n"
+
+    kb.append([InlineKeyboardButton(text="Очистити весь карантин", callback_data="quarantine_clear")])
+    return text, InlineKeyboardMarkup(inline_keyboard=kb)
+
+
+@dp.message(Command("quarantine"))
+async def cmd_quarantine(message: Message):
+    text, kb = _quarantine_view()
+    await message.answer(text, reply_markup=kb, parse_mode=ParseMode.HTML)
+
+
+@dp.callback_query(F.data == "quarantine_clear")
+async def quarantine_clear(cb: CallbackQuery):
+    removed = monitor.clear_quarantine()
+    await cb.message.edit_text(f"Карантин очищено, файлів: {removed}")
+    await cb.answer()
+
+
+@dp.callback_query(F.data.startswith("quarantine_del_"))
+async def quarantine_release(cb: CallbackQuery):
+    path_id = cb.data[len("quarantine_del_"):]
+    for item in monitor.get_quarantine():
+        if hashlib.md5(item['file_path'].encode('utf-8')).hexdigest() == path_id:
+            monitor.clear_quarantine(item['file_path'])
+            logger.info(f"Файл звільнено з карантину: {item['file_name']}")
+            break
+
+    text, kb = _quarantine_view()
+    await cb.message.edit_text(text, reply_markup=kb, parse_mode=ParseMode.HTML)
+    await cb.answer()
+
+
+def _fit(head: str, blocks: list, tail: str = "") -> str:
+    text = head
+    for i, block in enumerate(blocks):
+        if len(text) + len(block) + len(tail) > MESSAGE_LIMIT - 40:
+            return text + tail + f"\n… і ще {len(blocks) - i}"
+        text += block
+    return text + tail
+
+
+@dp.message(Command("metrics"))
+async def cmd_metrics(message: Message):
+    rows = metrics.summary()
+
+    text = "МЕТРИКИ\n\n"
+    if not rows:
+        text += "Даних поки немає"
+        await message.answer(text)
+        return
+
+    table = []
+    for row in rows:
+        line = (
+            f"{row['stage'][:27]:<28}{row['count']:>7}{row['avg_ms']:>9.1f}"
+            f"{row['p95_ms']:>9.1f}{row['max_ms']:>9.1f}"
+        )
+        line += f" !{row['errors']}\n" if row['errors'] else "\n"
+        table.append(html.escape(line))
+
+    header = f"{'етап':<28}{'к-сть':>7}{'сер.мс':>9}{'p95':>9}{'макс':>9}\n"
+    text = _fit(f"{text}<pre>{html.escape(header)}", table, "</pre>")
+
+    counts = "".join(f"{name}: {value:g}\n" for name, value in metrics.counters())
+    counts = f"\n<pre>{html.escape(counts)}</pre>" if counts else ""
+    if len(text) + len(counts) <= MESSAGE_LIMIT:
+        text += counts
     await message.answer(text, parse_mode=ParseMode.HTML)
 
 
+def _report_period(arg: str | None):
+    today = date.today()
+    arg = (arg or "month").strip().lower()
+
+    if arg == "month":
+        start = today.replace(day=1)
+    elif arg == "prev":
+        end = today.replace(day=1)
+        start = (end - timedelta(days=1)).replace(day=1)
+        return start, end
+    elif arg.endswith("d") and arg[:-1].isdigit():
+        return today - timedelta(days=int(arg[:-1]) - 1), today + timedelta(days=1)
+    elif ":" in arg:
+        first, last = arg.split(":", 1)
+        return date.fromisoformat(first), date.fromisoformat(last) + timedelta(days=1)
+    elif len(arg) == 4 and arg.isdigit():
+        return date(int(arg), 1, 1), date(int(arg) + 1, 1, 1)
+    else:
+        start = date.fromisoformat(f"{arg}-01")
+
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+
+@dp.message(Command("report"))
+async def cmd_report(message: Message):
+    args = (message.text or "").split()[1:]
+    group_by = "department"
+    period = None
+    for arg in args:
+        if arg.lower() in REPORT_GROUPS:
+            group_by = arg.lower()
+        else:
+            period = arg
+
+    try:
+        start, end = _report_period(period)
+    except ValueError:
+        await message.answer("Невідомий період. Приклади: /report month, /report 2025-03 approver, /report 30d supplier")
+        return
+
+    rows = db.get_application_report(start.isoformat(), end.isoformat(), group_by)
+
+    text = f"ЗВІТ ЗА {start:%d.%m.%Y} — {end - timedelta(days=1):%d.%m.%Y}\n"
+    text += f"Розріз: {group_by}\n\n"
+    if not rows:
+        text += "Заявок за цей період немає"
+        await message.answer(text)
+        return
+
+    blocks = []
+    for row in rows:
+        approved_amount = f"{row['approved_amount']:,.2f}".replace(",", " ")
+        blocks.append(
+            f"<b>{html.escape(str(row['grp']))}</b>\n"
+            f"   Погоджено: {row['approved']} на {approved_amount} грн\n"
+            f"   Відхилено: {row['rejected']}, очікує: {row['pending']}, всього: {row['total']}\n\n"
+        )
+
+    await message.answer(_fit(text, blocks), parse_mode=ParseMode.HTML)
+
+
+def _highlight(snippet: str) -> str:
+    return html.escape(snippet).replace("\x02", "<b>").replace("\x03", "</b>")
+
+
+def _find_view(query_id: str, offset: int = 0):
+    query = find_queries.get(query_id)
+    if query is None:
+        return "Пошук застарів, повторіть команду /find", None
+
+    result = db.search_applications(query, limit=FIND_PAGE_SIZE, offset=offset)
+    items = result["items"]
+
+    text = f"ПОШУК: <code>{html.escape(query)}</code>\n\n"
+    if not items:
+        text += "Нічого не знайдено" if offset == 0 else "Більше результатів немає"
+        return text, None
+
+    decisions = {"APPROVED": "погоджено", "REJECTED": "відхилено", "PENDING": "очікує"}
+    for i, item in enumerate(items, start=offset + 1):
+        amount = f"{item['amount']:,.2f}".replace(",", " ") + " грн" if item['amount'] is not None else "—"
+        text += f"{i}. <code>{html.escape(item['file_name'] or '')}</code>\n"
+        text += f"   {item['app_date'] or '—'} · {amount} · {decisions.get(item['decision'], item['decision'])}\n"
+        text += f"   {html.escape(item['supplier'] or '—')} · {html.escape(item['applicant'] or '—')}\n"
+        if item['snippet']:
+            text += f"   {_highlight(item['snippet'])}\n"
+        text += "\n"
+
+    nav = []
+    if offset > 0:
+        nav.append(InlineKeyboardButton(text="« Назад", callback_data=f"find_{query_id}_{max(0, offset - FIND_PAGE_SIZE)}"))
+    if result["has_more"]:
+        nav.append(InlineKeyboardButton(text="Далі »", callback_data=f"find_{query_id}_{offset + FIND_PAGE_SIZE}"))
+
+    return text, InlineKeyboardMarkup(inline_keyboard=[nav]) if nav else None
+
+
+@dp.message(Command("find"))
+async def cmd_find(message: Message):
+    query = (message.text or "").partition(" ")[2].strip()
+    if not query:
+        await message.answer("Вкажіть текст для пошуку, наприклад: /find Ромашка оренда")
+        return
+
+    query_id = hashlib.md5(query.encode('utf-8')).hexdigest()[:12]
+    find_queries.pop(query_id, None)
+    find_queries[query_id] = query
+    while len(find_queries) > FIND_QUERIES_LIMIT:
+        find_queries.pop(next(iter(find_queries)))
+
+    text, kb = _find_view(query_id)
+    await message.answer(text, reply_markup=kb, parse_mode=ParseMode.HTML)
+
+
+@dp.callback_query(F.data.startswith("find_"))
+async def find_page(cb: CallbackQuery):
+    query_id, _, offset = cb.data[len("find_"):].partition("_")
+    text, kb = _find_view(query_id, int(offset or 0))
+    await cb.message.edit_text(text, reply_markup=kb, parse_mode=ParseMode.HTML)
+    await cb.answer()
+
+
+@dp.message(Command("audit"))
+async def cmd_audit(message: Message):
+    query = (message.text or "").partition(" ")[2].strip()
+
+    if not query:
+        today = date.today()
+        since = date(today.year - 1, today.month + 1, 1) if today.month < 12 else date(today.year, 1, 1)
+        rows = await asyncio.to_thread(db.get_monthly_actions, since.strftime("%Y-%m"))
+
+        text = "ЖУРНАЛ ПО МІСЯЦЯХ\n\n"
+        if not rows:
+            text += "Записів немає"
+            await message.answer(text)
+            return
+
+        months = {}
+        for row in rows:
+            months.setdefault(row["month"], {})[row["action"]] = row["count"]
+        blocks = [
+            f"<b>{month}</b>: " + ", ".join(f"{action or '—'} {count}" for action, count in actions.items()) + "\n"
+            for month, actions in months.items()
+        ]
+        await message.answer(_fit(text, blocks), parse_mode=ParseMode.HTML)
+        return
+
+    rows = await asyncio.to_thread(db.get_action_history, query, retention.archive_path)
+
+    text = f"ІСТОРІЯ: <code>{html.escape(query)}</code>\n\n"
+    if not rows:
+        text += "Нічого не знайдено"
+    blocks = []
+    for row in rows:
+        archived = " (архів)" if row["archived"] else ""
+        blocks.append(
+            f"<code>{html.escape(row['file_name'] or '')}</code>{archived}\n"
+            f"   {row['action']} by {html.escape(row['user'] or '')}, {(row['timestamp'] or '')[:19]}\n"
+        )
+    await message.answer(_fit(text, blocks), parse_mode=ParseMode.HTML)
+
+
 @dp.message(Command("settings"))
 async def cmd_settings(message: Message):
     kb = [
@@ -169,6 +552,7 @@ async def save_new_path(message: Message, state: FSMContext):
     await state.clear()
 
 
+@metrics.timed("stage", stage="send_application")
 async def send_application(data):
     if data["intended_approver"] == "ФІНДИРЕКТОР":
         chat_id = config.CHAT_ID_FINDIRECTOR
@@ -182,7 +566,7 @@ async def send_application(data):
         logger.error(f"Chat ID не налаштовано для {data['intended_approver']}")
         return
 
-    file_id = hashlib.md5(data['file_path'].encode('utf-8')).hexdigest()
+    file_id = Database.make_file_id(data['file_path'])
 
     text = (
         "НОВА ЗАЯВКА НА ПОГОДЖЕННЯ\n\n"
@@ -203,99 +587,117 @@ async def send_application(data):
     ]])
 
     try:
-        active_applications[file_id] = data
-        await bot.send_message(chat_id, text, reply_markup=kb, parse_mode=ParseMode.HTML)
-        logger.info(f"Заявка відправлена: {data['file_name']} → {data['intended_approver']}")
+        active_applications.remember(file_id, data)
+        notifier.submit(
+            chat_id, text,
+            label=f"{data['file_name']} ({data['intended_approver']})",
+            on_sent=lambda: monitor.writer.mark_sent(file_id),
+            reply_markup=kb, parse_mode=ParseMode.HTML
+        )
+        logger.info(f"Заявка в черзі на відправку: {data['file_name']} → {data['intended_approver']}")
     except Exception as e:
         logger.error(f"Помилка відправки: {e}")
 
 
-@dp.callback_query(F.data.startswith("approve_"))
-async def approve(cb: CallbackQuery):
+async def queue_decision(cb: CallbackQuery, approved: bool):
     await cb.answer()
-    
-    file_id = cb.data[len("approve_"):]
+
+    prefix = "approve_" if approved else "reject_"
+    file_id = cb.data[len(prefix):]
     data = active_applications.get(file_id)
     
     if not data:
         await cb.message.answer("Заявка вже оброблена або не знайдена")
         return
 
-    await cb.message.edit_text("Обробка заявки...")
+    user_name = cb.from_user.first_name or cb.from_user.username or "Невідомо"
+    moves.submit(file_id, data, approved, user_name, cb.message.chat.id, cb.message.message_id)
+    active_applications.pop(file_id, None)
 
-    success = excel.move_file(data['file_path'], approved=True)
-    
-    if success:
-        user_name = cb.from_user.first_name or cb.from_user.username or "Невідомо"
-        db.log_action(data['file_name'], "APPROVED", user_name, f"Сума: {data['сума']}")
-        
-        await cb.message.edit_text(
-            f"ЗАЯВКУ ПОГОДЖЕНО\n\n"
-            f"{data['file_name']}\n"
-            f"{data['сума']}\n"
-            f"Погодив: {user_name}\n"
-            f"Файл переміщено далі по маршруту",
-            parse_mode=ParseMode.HTML
-        )
-        logger.info(f"APPROVED: {data['file_name']} by {user_name}")
+    if approved:
+        await cb.message.edit_text(f"Заявку погоджено, файл переміщується...\n\n{data['file_name']}")
     else:
-        await cb.message.edit_text("Помилка переміщення файлу")
+        await cb.message.edit_text(f"Заявку відхилено, файл переміщується...\n\n{data['file_name']}")
 
-    active_applications.pop(file_id, None)
+
+@dp.callback_query(F.data.startswith("approve_"))
+async def approve(cb: CallbackQuery):
+    await queue_decision(cb, approved=True)
 
 
 @dp.callback_query(F.data.startswith("reject_"))
 async def reject(cb: CallbackQuery):
-    await cb.answer()
-    
-    file_id = cb.data[len("reject_"):]
-    data = active_applications.get(file_id)
-    
-    if not data:
-        await cb.message.answer("Заявка вже оброблена або не знайдена")
-        return
+    await queue_decision(cb, approved=False)
 
-    await cb.message.edit_text("Відхилення заявки...")
 
-    success = excel.move_file(data['file_path'], approved=False)
-    
+async def on_move_finished(job, data, success):
+    user_name = job["user_name"]
+
     if success:
-        user_name = cb.from_user.first_name or cb.from_user.username or "Невідомо"
+        stage = data.get("intended_approver")
+        db.set_application_decision(
+            job["file_id"], stage,
+            "APPROVED" if job["approved"] else "REJECTED", user_name,
+            final=not job["approved"] or stage == FINAL_STAGE,
+            moved_to=job.get("moved_to"),
+        )
+
+    if not success:
+        text = "Помилка переміщення файлу"
+    elif job["approved"]:
+        db.log_action(data['file_name'], "APPROVED", user_name, f"Сума: {data['сума']}")
+        text = (
+            f"ЗАЯВКУ ПОГОДЖЕНО\n\n"
+            f"{data['file_name']}\n"
+            f"{data['сума']}\n"
+            f"Погодив: {user_name}\n"
+            f"Файл переміщено далі по маршруту"
+        )
+        logger.info(f"APPROVED: {data['file_name']} by {user_name}")
+    else:
         db.log_action(data['file_name'], "REJECTED", user_name, f"Сума: {data['сума']}")
-        
-        await cb.message.edit_text(
+        text = (
             f"ЗАЯВКУ ВІДХИЛЕНО\n\n"
             f"{data['file_name']}\n"
             f"{data['сума']}\n"
             f"Відхилив: {user_name}\n"
-            f"Файл переміщено в папку «Відхилені»",
-            parse_mode=ParseMode.HTML
+            f"Файл переміщено в папку «Відхилені»"
         )
         logger.info(f"REJECTED: {data['file_name']} by {user_name}")
-    else:
-        await cb.message.edit_text("Помилка переміщення файлу")
 
-    active_applications.pop(file_id, None)
+    try:
+        await bot.edit_message_text(
+            text, chat_id=job["chat_id"], message_id=job["message_id"], parse_mode=ParseMode.HTML
+        )
+    except TelegramAPIError as e:
+        logger.warning(f"Не вдалося оновити повідомлення для {data['file_name']}: {e}")
 
 
 async def monitoring_task():
     logger.info("Моніторинг розпочато")
+    monitor.start_watching()
     
     while True:
         try:
-            new_applications = monitor.check_folders()
-            
-            for app in new_applications:
+            async for app in monitor.scan_iter():
                 await send_application(app)
-                await asyncio.sleep(0.5)
             
-            await asyncio.sleep(config.CHECK_INTERVAL)
+            await monitor.wait_for_changes(monitor.next_scan_delay())
             
         except Exception as e:
             logger.error(f"Помилка моніторингу: {e}", exc_info=True)
             await asyncio.sleep(10)
 
 
+async def metrics_task():
+    while True:
+        await asyncio.sleep(config.METRICS_INTERVAL)
+        try:
+            await asyncio.to_thread(metrics.write_textfile, config.METRICS_FILE)
+        except Exception as e:
+            logger.warning(f"Не вдалося записати метрики у {config.METRICS_FILE}: {e}")
+
+
 async def main():
     logger.info("="*70)
     logger.info("ЗАПУСК БОТА ДЛЯ ПОГОДЖЕННЯ ЗАЯВОК")
@@ -304,8 +706,19 @@ async def main():
     if not config.BOT_TOKEN or config.BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
         logger.error("BOT_TOKEN не налаштовано в .env файлі!")
         return
+
+    create_services()
     
     config.ensure_folders_exist()
+
+    restored = active_applications.load()
+    logger.info(f"Відновлено заявок, що очікують погодження: {restored}")
+
+    unsent = db.get_unsent_applications()
+    for _, data in unsent:
+        await send_application(data)
+    if unsent:
+        logger.info(f"Повторно поставлено в чергу невідправлених заявок: {len(unsent)}")
     
     logger.info("Перевірка папок:")
     for key, path in config.PATHS.items():
@@ -315,13 +728,29 @@ async def main():
             status = "Активно" if exists else "Не знайдено"
             logger.info(f"   {status} {key}: {path}")
     
+    if config.RETENTION_DAYS > 0:
+        retention.prepare()
+
+    moves.start(on_move_finished)
+
     asyncio.create_task(monitoring_task())
+    if config.METRICS_FILE:
+        asyncio.create_task(metrics_task())
+    if config.RETENTION_DAYS > 0:
+        retention.start()
     
     logger.info("="*70)
     logger.info("БОТ ПРАЦЮЄ")
     logger.info("="*70)
     
-    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    try:
+        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    finally:
+        await moves.stop()
+        await asyncio.to_thread(retention.stop)
+        await notifier.close()
+        monitor.shutdown()
+        db.close()
 
 
 if __name__ == "__main__":
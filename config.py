@@ -1,11 +1,19 @@
 import os
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
-from database import Database
 
-load_dotenv()
+_env_loaded = False
+_paths = None
+_lock = threading.RLock()
 
-BOT_TOKEN = os.getenv("BOT_TOKEN", "").strip()
+
+def load_env():
+    global _env_loaded
+    with _lock:
+        if not _env_loaded:
+            load_dotenv()
+            _env_loaded = True
 
 def parse_chat_id(value):
     try:
@@ -15,13 +23,67 @@ def parse_chat_id(value):
     except:
         return None
 
-CHAT_ID_DIRECTOR = parse_chat_id(os.getenv("CHAT_ID_DIRECTOR"))
-CHAT_ID_FINDIRECTOR = parse_chat_id(os.getenv("CHAT_ID_FINDIRECTOR"))
-
-CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "10"))
-FILE_SETTLE_TIME = int(os.getenv("FILE_SETTLE_TIME", "5"))
+def parse_business_hours(value: str) -> tuple | None:
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        start, end = value.split("-", 1)
+        start_h, start_m = start.strip().split(":")
+        end_h, end_m = end.strip().split(":")
+        return int(start_h) * 60 + int(start_m), int(end_h) * 60 + int(end_m)
+    except:
+        print(f"⚠️ Некоректний BUSINESS_HOURS: {value}, робочі години вимкнено")
+        return None
 
-_db = Database()
+def parse_business_days(value: str) -> frozenset:
+    days = set()
+    try:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            first, _, last = part.partition("-")
+            days.update(range(int(first), int(last or first) + 1))
+    except:
+        print(f"⚠️ Некоректний BUSINESS_DAYS: {value}, використано пн-пт")
+        return frozenset(range(1, 6))
+    return frozenset(days)
+
+_SETTINGS = {
+    "BOT_TOKEN": ("", str.strip),
+    "CHAT_ID_DIRECTOR": (None, parse_chat_id),
+    "CHAT_ID_FINDIRECTOR": (None, parse_chat_id),
+    "CHECK_INTERVAL": ("10", int),
+    "FILE_SETTLE_TIME": ("5", int),
+    "PARSE_CACHE_SIZE": ("256", int),
+    "XLSX_READER": ("fast", lambda v: v.strip().lower()),
+    "NOTIFY_GLOBAL_RATE": ("30", float),
+    "NOTIFY_CHAT_RATE": ("1", float),
+    "NOTIFY_CHAT_BURST": ("3", float),
+    "NOTIFY_GROUP_RATE": ("20", float),
+    "MOVE_MAX_ATTEMPTS": ("8", int),
+    "DB_FLUSH_INTERVAL_MS": ("200", int),
+    "DB_FLUSH_BATCH": ("500", int),
+    "RETENTION_DAYS": ("365", int),
+    "RETENTION_INTERVAL_HOURS": ("24", float),
+    "RETENTION_BATCH": ("1000", int),
+    "ARCHIVE_DATABASE": ("", lambda v: v.strip() or None),
+    "METRICS_FILE": ("metrics.prom", str.strip),
+    "METRICS_INTERVAL": ("30", int),
+    "ACTIVE_APPLICATIONS_CACHE": ("1000", int),
+    "PARSE_WORKERS": (lambda: str(min(4, os.cpu_count() or 1)), int),
+    "PROCESSED_INDEX_CAPACITY": ("200000", int),
+    "PROCESSED_INDEX_SYNC": ("60", int),
+    "WATCHER_BACKEND": ("auto", lambda v: v.strip().lower()),
+    "WATCHER_RESCAN_INTERVAL": ("300", int),
+    "SCAN_INTERVAL_MIN": ("2", float),
+    "SCAN_INTERVAL_MAX": ("120", float),
+    "SCAN_BACKOFF": ("2", float),
+    "BUSINESS_HOURS": ("08:00-19:00", parse_business_hours),
+    "BUSINESS_DAYS": ("1-5", parse_business_days),
+    "BUSINESS_SCAN_INTERVAL": (lambda: os.getenv("CHECK_INTERVAL", "10"), float),
+}
 
 DEFAULT_PATHS = {
     "director_folder":    r"C:\Users\Yevhen\OneDrive\Документы\Облік замовлень\Директор",
@@ -31,20 +93,46 @@ DEFAULT_PATHS = {
     "rejected_folder":    r"C:\Users\Yevhen\OneDrive\Документы\Облік замовлень\Відхилені",
 }
 
-_PATHS = {}
-for key, default in DEFAULT_PATHS.items():
-    saved = _db.get_setting(key)
-    _PATHS[key] = saved if saved is not None else default
-    if saved is None:
-        _db.set_setting(key, default)
-
-PATHS = _PATHS
+def _settings_db():
+    from database import get_database
+    return get_database()
+
+
+def _load_paths() -> dict:
+    global _paths
+    with _lock:
+        if _paths is None:
+            db = _settings_db()
+            saved = db.get_all_settings()
+            paths = {}
+            for key, default in DEFAULT_PATHS.items():
+                paths[key] = saved.get(key, default)
+                if key not in saved:
+                    db.set_setting(key, default)
+            _paths = paths
+        return _paths
+
+
+def __getattr__(name):
+    if name == "PATHS":
+        return _load_paths()
+    if name in _SETTINGS:
+        load_env()
+        default, parse = _SETTINGS[name]
+        raw = os.getenv(name)
+        if raw is None:
+            raw = default() if callable(default) else default
+        value = parse(raw)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_path(key: str) -> str | None:
-    return PATHS.get(key)
+    return _load_paths().get(key)
 
 def update_path(key: str, new_path: str) -> bool:
-    if key not in PATHS:
+    paths = _load_paths()
+    if key not in paths:
         return False
 
     new_path = new_path.strip()
@@ -53,8 +141,8 @@ def update_path(key: str, new_path: str) -> bool:
 
     try:
         Path(new_path).mkdir(parents=True, exist_ok=True)
-        PATHS[key] = new_path
-        success = _db.set_setting(key, new_path)
+        paths[key] = new_path
+        success = _settings_db().set_setting(key, new_path)
         if success:
             print(f"Шлях збережено в БД: {key} → {new_path}")
         return success
@@ -63,18 +151,9 @@ def update_path(key: str, new_path: str) -> bool:
         return False
 
 def ensure_folders_exist():
-    for path in PATHS.values():
+    for path in _load_paths().values():
         if path:
             try:
                 Path(path).mkdir(parents=True, exist_ok=True)
             except Exception as e:
                 print(f"Не вдалося створити папку {path}: {e}")
-
-ensure_folders_exist()
-
-if __name__ != "__main__":
-    print("\nНалаштування шляхів (з бази даних):")
-    for k, v in PATHS.items():
-        status = "OK" if Path(v).exists() else "НЕМАЄ"
-        print(f"   {k:20} → {v} [{status}]")
-    print()
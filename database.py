@@ -1,21 +1,138 @@
 # database.py
 import sqlite3
+import hashlib
+import json
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
+import metrics
 
 DATABASE_NAME = "processed_files.db"
+BUSY_TIMEOUT = 30
+STATEMENT_CACHE_SIZE = 256
+
+
+def _query(fn):
+    return metrics.timed("db", op=fn.__name__)(fn)
+
+
+REPORT_GROUPS = {
+    "department": "department",
+    "approver": "approver",
+    "applicant": "applicant",
+    "supplier": "supplier",
+    "payment": "payment_type",
+}
+
+
+SEARCH_COLUMNS = ("file_name", "applicant", "department", "supplier", "purpose")
+SEARCH_FIELDS = """
+    a.id, a.file_name, a.app_date, a.amount, a.applicant, a.department,
+    a.supplier, a.purpose, a.approver, a.decision
+"""
+
+
+MIGRATIONS = (
+    (1, "основні таблиці", "init_db"),
+    (2, "налаштування", "init_settings_table"),
+    (3, "повнотекстовий пошук", "init_search"),
+    (4, "рішення по етапах", "init_application_stages"),
+    (5, "доставка сповіщень", "init_notification_delivery"),
+    (6, "місячні підсумки журналу", "init_action_rollup"),
+)
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_database() -> "Database":
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Database()
+        return _shared
+
+
+def fts_query(text: str) -> str:
+    terms = [term.replace('"', '""') for term in text.split() if term.strip('"')]
+    return " ".join(f'"{term}"*' for term in terms)
+
 
 class Database:
-    def __init__(self):
-        self.db_path = DATABASE_NAME
-        self.init_db()
-        self.init_settings_table()  
+    def __init__(self, db_path: str = DATABASE_NAME):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._processed_listeners = []
+        self.fts_enabled = False
+        self.migrate()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA recursive_triggers=ON")
+        conn.create_function("casefold", 1, lambda value: value.casefold() if value else value, deterministic=True)
+
+        self._local.conn = conn
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+
+        for conn in connections:
+            try:
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            except Exception as e:
+                print(f"Помилка закриття з'єднання з БД: {e}")
+
+
+    def add_processed_listener(self, callback):
+        self._processed_listeners.append(callback)
+
+    def _notify_processed(self, file_path, file_hash=None):
+        for callback in self._processed_listeners:
+            try:
+                callback(file_path, file_hash)
+            except Exception as e:
+                print(f"Помилка обробника processed_files: {e}")
+
+    def migrate(self):
+        conn = self._connect()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for number, title, method in MIGRATIONS:
+            if number <= version:
+                continue
+            getattr(self, method)()
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+            print(f"🛠️ Міграція БД {number}: {title}")
 
+        self.fts_enabled = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'applications_fts'"
+        ).fetchone() is not None
 
     def init_db(self):
 
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -51,14 +168,223 @@ class Database:
             """)
 
 
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS quarantine (
+                    file_path TEXT PRIMARY KEY,
+                    file_name TEXT,
+                    file_size INTEGER,
+                    file_mtime_ns INTEGER,
+                    reason TEXT,
+                    quarantined_at TEXT
+                )
+            """)
+
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS active_applications (
+                    file_id TEXT PRIMARY KEY,
+                    file_path TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at TEXT
+                )
+            """)
+
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS applications (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_id TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    file_name TEXT,
+                    app_date TEXT,
+                    amount REAL,
+                    applicant TEXT,
+                    department TEXT,
+                    supplier TEXT,
+                    purpose TEXT,
+                    payment_type TEXT,
+                    form_status TEXT,
+                    approver TEXT,
+                    decision TEXT NOT NULL DEFAULT 'PENDING',
+                    decided_by TEXT,
+                    decided_at TEXT,
+                    detected_at TEXT
+                )
+            """)
+
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS move_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_id TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    approved INTEGER NOT NULL,
+                    user_name TEXT,
+                    chat_id INTEGER,
+                    message_id INTEGER,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'PENDING',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at TEXT,
+                    updated_at TEXT
+                )
+            """)
+
+
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_path ON processed_files(file_path)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_hash ON processed_files(file_hash)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON actions_log(timestamp DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_move_jobs_due ON move_jobs(status, next_attempt_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_file_id ON applications(file_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_date ON applications(app_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_department ON applications(department, app_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_approver ON applications(approver, app_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_applicant ON applications(applicant, app_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_applications_supplier ON applications(supplier, app_date)")
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("""
+                INSERT OR IGNORE INTO counters (name, value)
+                SELECT 'processed_files', COUNT(*) FROM processed_files
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_processed_files_insert
+                AFTER INSERT ON processed_files
+                BEGIN
+                    UPDATE counters SET value = value + 1 WHERE name = 'processed_files';
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_processed_files_delete
+                AFTER DELETE ON processed_files
+                BEGIN
+                    UPDATE counters SET value = value - 1 WHERE name = 'processed_files';
+                END
+            """)
 
             conn.commit()
 
+    def init_search(self):
+        with self._connect() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'applications_fts'"
+            ).fetchone()
+            try:
+                conn.execute(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS applications_fts USING fts5(
+                        {", ".join(SEARCH_COLUMNS)},
+                        content='applications',
+                        content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2'
+                    )
+                """)
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ FTS5 недоступний ({e}), пошук працюватиме через LIKE")
+                return
+
+            columns = ", ".join(SEARCH_COLUMNS)
+            new_columns = ", ".join(f"new.{c}" for c in SEARCH_COLUMNS)
+            old_columns = ", ".join(f"old.{c}" for c in SEARCH_COLUMNS)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_applications_fts_insert AFTER INSERT ON applications
+                BEGIN
+                    INSERT INTO applications_fts (rowid, {columns}) VALUES (new.id, {new_columns});
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_applications_fts_delete AFTER DELETE ON applications
+                BEGIN
+                    INSERT INTO applications_fts (applications_fts, rowid, {columns})
+                    VALUES ('delete', old.id, {old_columns});
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_applications_fts_update AFTER UPDATE OF {columns} ON applications
+                BEGIN
+                    INSERT INTO applications_fts (applications_fts, rowid, {columns})
+                    VALUES ('delete', old.id, {old_columns});
+                    INSERT INTO applications_fts (rowid, {columns}) VALUES (new.id, {new_columns});
+                END
+            """)
+            if not exists:
+                conn.execute("INSERT INTO applications_fts (applications_fts) VALUES ('rebuild')")
+
+    def init_application_stages(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS application_decisions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    application_id INTEGER NOT NULL,
+                    stage TEXT,
+                    decision TEXT NOT NULL,
+                    decided_by TEXT,
+                    decided_at TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_application_decisions_application
+                ON application_decisions(application_id)
+            """)
+            conn.execute("""
+                INSERT INTO application_decisions (application_id, stage, decision, decided_by, decided_at)
+                SELECT id, approver, decision, decided_by, decided_at
+                FROM applications WHERE decision != 'PENDING'
+            """)
+            conn.execute("""
+                UPDATE application_decisions SET application_id = (
+                    SELECT MAX(a.id) FROM applications a
+                    WHERE a.file_id = (SELECT file_id FROM applications WHERE id = application_decisions.application_id)
+                )
+            """)
+            conn.execute("""
+                UPDATE applications SET (decision, decided_by, decided_at) = (
+                    SELECT decision, decided_by, decided_at FROM application_decisions d
+                    WHERE d.application_id = applications.id
+                    ORDER BY d.id DESC LIMIT 1
+                )
+                WHERE decision = 'PENDING'
+                  AND EXISTS (SELECT 1 FROM application_decisions d WHERE d.application_id = applications.id)
+            """)
+            conn.execute("""
+                DELETE FROM applications
+                WHERE id NOT IN (SELECT MAX(id) FROM applications GROUP BY file_id)
+            """)
+            conn.execute("DROP INDEX IF EXISTS idx_applications_file_id")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_applications_file_id ON applications(file_id)")
+
+    def init_notification_delivery(self):
+        with self._connect() as conn:
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(active_applications)")}
+            if "sent_at" not in columns:
+                conn.execute("ALTER TABLE active_applications ADD COLUMN sent_at TEXT")
+                conn.execute("UPDATE active_applications SET sent_at = created_at")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_active_applications_unsent
+                ON active_applications(created_at) WHERE sent_at IS NULL
+            """)
+
+    def init_action_rollup(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS actions_monthly (
+                    month TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    user TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (month, action, user)
+                )
+            """)
+
     def init_settings_table(self):
 
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS settings (
                     key TEXT PRIMARY KEY,
@@ -67,10 +393,11 @@ class Database:
             """)
 
 
+    @_query
     def get_setting(self, key: str, default=None):
 
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
                 row = cursor.fetchone()
@@ -79,10 +406,11 @@ class Database:
             print(f"Помилка читання налаштування {key}: {e}")
             return default
 
+    @_query
     def set_setting(self, key: str, value: str):
 
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.execute("""
                     INSERT INTO settings (key, value)
                     VALUES (?, ?)
@@ -97,24 +425,32 @@ class Database:
     def get_all_settings(self):
 
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT key, value FROM settings")
                 return {row["key"]: row["value"] for row in cursor.fetchall()}
         except:
             return {}
 
+    @staticmethod
+    def make_file_id(file_path):
+        return hashlib.md5(str(file_path).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def make_file_hash(file_path, size, mtime):
+        return f"{file_path}_{size}_{mtime}"
+
     def get_file_hash(self, file_path):
         try:
             stat = os.stat(file_path)
-            return f"{file_path}_{stat.st_size}_{stat.st_mtime}"
+            return self.make_file_hash(file_path, stat.st_size, stat.st_mtime)
         except:
             return file_path
 
+    @_query
     def is_file_processed(self, file_path):
         file_hash = self.get_file_hash(file_path)
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT 1 FROM processed_files WHERE file_path = ?", (file_path,))
             if cursor.fetchone():
@@ -122,36 +458,95 @@ class Database:
             cursor.execute("SELECT 1 FROM processed_files WHERE file_hash = ?", (file_hash,))
             return cursor.fetchone() is not None
 
+    @_query
+    def get_processed_paths(self, file_paths, file_hashes=None) -> set:
+        file_paths = list(file_paths)
+        if not file_paths:
+            return set()
+
+        if file_hashes is None:
+            file_hashes = [self.get_file_hash(fp) for fp in file_paths]
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS scan_candidates (
+                    file_path TEXT PRIMARY KEY,
+                    file_hash TEXT
+                )
+            """)
+            conn.execute("DELETE FROM temp.scan_candidates")
+            conn.executemany(
+                "INSERT OR IGNORE INTO temp.scan_candidates (file_path, file_hash) VALUES (?, ?)",
+                zip(file_paths, file_hashes)
+            )
+            cursor = conn.execute("""
+                SELECT c.file_path
+                FROM temp.scan_candidates c
+                WHERE EXISTS (SELECT 1 FROM processed_files p WHERE p.file_path = c.file_path)
+                   OR EXISTS (SELECT 1 FROM processed_files p WHERE p.file_hash = c.file_hash)
+            """)
+            processed = {row[0] for row in cursor.fetchall()}
+            conn.execute("DELETE FROM temp.scan_candidates")
+
+        return processed
+
+    @_query
+    def get_processed_max_id(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(id) FROM processed_files").fetchone()
+            return row[0] or 0
+
+    def iter_processed_keys(self, after_id: int = 0, batch_size: int = 5000):
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute("""
+                    SELECT id, file_path, file_hash
+                    FROM processed_files
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                """, (after_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row["id"], row["file_path"], row["file_hash"]
+            after_id = rows[-1]["id"]
+
+    @_query
     def add_processed_file(self, file_path, approver):
         try:
             file_name = Path(file_path).name
             file_hash = self.get_file_hash(file_path)
             timestamp = datetime.now().isoformat()
 
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.execute("""
                     INSERT OR REPLACE INTO processed_files
                     (file_path, file_name, file_hash, processed_at, approver, status)
                     VALUES (?, ?, ?, ?, ?, 'DETECTED')
                 """, (file_path, file_name, file_hash, timestamp, approver))
+            self._notify_processed(file_path, file_hash)
             return True
         except Exception as e:
             print(f"Помилка додавання файлу в БД: {e}")
             return False
 
+    @_query
     def update_file_status(self, file_path, status):
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.execute("UPDATE processed_files SET status = ? WHERE file_path = ?", (status, file_path))
+            self._notify_processed(file_path)
             return True
         except Exception as e:
             print(f"Помилка оновлення статусу: {e}")
             return False
 
+    @_query
     def log_action(self, file_name, action, user, details=""):
         try:
             timestamp = datetime.now().isoformat()
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.execute("""
                     INSERT INTO actions_log (file_name, action, user, timestamp, details)
                     VALUES (?, ?, ?, ?, ?)
@@ -161,16 +556,215 @@ class Database:
             print(f"Помилка логування: {e}")
             return False
 
+    @_query
+    def write_batch(self, processed=(), actions=(), applications=(), active=(), sent=()) -> bool:
+        try:
+            with self._connect() as conn:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO processed_files
+                    (file_path, file_name, file_hash, processed_at, approver, status)
+                    VALUES (?, ?, ?, ?, ?, 'DETECTED')
+                """, processed)
+                conn.executemany("""
+                    INSERT INTO actions_log (file_name, action, user, timestamp, details)
+                    VALUES (?, ?, ?, ?, ?)
+                """, actions)
+                conn.executemany("""
+                    INSERT INTO applications
+                    (file_id, file_path, file_name, app_date, amount, applicant, department,
+                     supplier, purpose, payment_type, form_status, approver, detected_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(file_id) DO UPDATE SET
+                        file_path = excluded.file_path,
+                        file_name = excluded.file_name,
+                        app_date = excluded.app_date,
+                        amount = excluded.amount,
+                        applicant = excluded.applicant,
+                        department = excluded.department,
+                        supplier = excluded.supplier,
+                        purpose = excluded.purpose,
+                        payment_type = excluded.payment_type,
+                        form_status = excluded.form_status,
+                        approver = excluded.approver
+                """, applications)
+                conn.executemany("""
+                    INSERT INTO active_applications (file_id, file_path, data, created_at, sent_at)
+                    VALUES (?, ?, ?, ?, NULL)
+                    ON CONFLICT(file_id) DO UPDATE SET
+                        file_path = excluded.file_path,
+                        data = excluded.data
+                """, active)
+                conn.executemany(
+                    "UPDATE active_applications SET sent_at = ? WHERE file_id = ?", sent
+                )
+        except Exception as e:
+            print(f"Помилка пакетного запису в БД: {e}")
+            return False
+
+        for file_path, _, file_hash, _, _ in processed:
+            self._notify_processed(file_path, file_hash)
+        return True
+
+    @staticmethod
+    def application_row(data, detected_at=None):
+        detected_at = detected_at or datetime.now().isoformat()
+
+        def text(key):
+            value = data.get(key)
+            return None if value in (None, "", "—") else str(value).strip()
+
+        return (
+            Database.make_file_id(data["file_path"]),
+            data["file_path"],
+            data["file_name"],
+            data.get("date_iso") or detected_at[:10],
+            data.get("amount"),
+            text("заявник"),
+            text("відділ"),
+            text("постачальник"),
+            text("призначення"),
+            text("вид_розрахунку"),
+            text("статус"),
+            data.get("intended_approver"),
+            detected_at,
+        )
+
+    @_query
+    def set_application_decision(self, file_id, stage, decision, decided_by, final=True, moved_to=None):
+        decided_at = datetime.now().isoformat()
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT id FROM applications WHERE file_id = ?", (file_id,)).fetchone()
+                if row is None:
+                    return False
+
+                conn.execute("""
+                    INSERT INTO application_decisions (application_id, stage, decision, decided_by, decided_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (row["id"], stage, decision, decided_by, decided_at))
+                if final:
+                    conn.execute("""
+                        UPDATE applications SET decision = ?, decided_by = ?, decided_at = ?
+                        WHERE id = ?
+                    """, (decision, decided_by, decided_at, row["id"]))
+                if moved_to:
+                    conn.execute("""
+                        UPDATE OR REPLACE applications SET file_id = ?, file_path = ?, file_name = ?
+                        WHERE id = ?
+                    """, (self.make_file_id(moved_to), moved_to, Path(moved_to).name, row["id"]))
+            return True
+        except Exception as e:
+            print(f"Помилка збереження рішення: {e}")
+            return False
+
+    @_query
+    def get_application_report(self, date_from, date_to, group_by="department", limit=30):
+        column = REPORT_GROUPS[group_by]
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT COALESCE({column}, '—') AS grp,
+                       COUNT(*) AS total,
+                       SUM(decision = 'APPROVED') AS approved,
+                       SUM(decision = 'REJECTED') AS rejected,
+                       SUM(decision = 'PENDING') AS pending,
+                       COALESCE(SUM(CASE WHEN decision = 'APPROVED' THEN amount END), 0) AS approved_amount,
+                       COALESCE(SUM(amount), 0) AS total_amount
+                FROM applications
+                WHERE app_date >= ? AND app_date < ?
+                GROUP BY grp
+                ORDER BY approved_amount DESC, total DESC
+                LIMIT ?
+            """, (date_from, date_to, limit)).fetchall()
+            return [dict(row) for row in rows]
+
+    @_query
+    def search_applications(self, text, limit=5, offset=0):
+        query = fts_query(text)
+        if not query:
+            return {"items": [], "has_more": False}
+
+        try:
+            with self._connect() as conn:
+                if self.fts_enabled:
+                    rows = conn.execute(f"""
+                        SELECT {SEARCH_FIELDS},
+                               snippet(applications_fts, -1, '\x02', '\x03', '…', 10) AS snippet
+                        FROM applications_fts
+                        JOIN applications a ON a.id = applications_fts.rowid
+                        WHERE applications_fts MATCH ?
+                        ORDER BY bm25(applications_fts, 2.0, 1.0, 1.0, 3.0, 2.0), a.id DESC
+                        LIMIT ? OFFSET ?
+                    """, (query, limit + 1, offset)).fetchall()
+                else:
+                    terms = [f"%{term.casefold()}%" for term in text.split()]
+                    haystack = " || ' ' || ".join(f"COALESCE(a.{c}, '')" for c in SEARCH_COLUMNS)
+                    where = " AND ".join(f"casefold({haystack}) LIKE ?" for _ in terms)
+                    rows = conn.execute(f"""
+                        SELECT {SEARCH_FIELDS}, NULL AS snippet
+                        FROM applications a
+                        WHERE {where}
+                        ORDER BY a.id DESC
+                        LIMIT ? OFFSET ?
+                    """, (*terms, limit + 1, offset)).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"Помилка пошуку '{text}': {e}")
+            return {"items": [], "has_more": False}
+
+        return {"items": [dict(row) for row in rows[:limit]], "has_more": len(rows) > limit}
+
+    @_query
+    def get_monthly_actions(self, since_month):
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT month, action, SUM(count) AS count FROM (
+                    SELECT month, action, count FROM actions_monthly WHERE month >= ?
+                    UNION ALL
+                    SELECT substr(timestamp, 1, 7), COALESCE(action, ''), COUNT(*)
+                    FROM actions_log WHERE timestamp >= ?
+                    GROUP BY 1, 2
+                )
+                GROUP BY month, action
+                ORDER BY month DESC, action
+            """, (since_month, since_month)).fetchall()
+            return [dict(row) for row in rows]
+
+    @_query
+    def get_action_history(self, text, archive_path=None, limit=20):
+        query = """
+            SELECT file_name, action, user, timestamp, details
+            FROM actions_log
+            WHERE file_name LIKE ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        """
+        params = (f"%{text}%", limit)
+
+        with self._connect() as conn:
+            rows = [dict(row, archived=False) for row in conn.execute(query, params)]
+
+        if archive_path and os.path.exists(archive_path):
+            archive = sqlite3.connect(f"{Path(archive_path).resolve().as_uri()}?mode=ro", uri=True, timeout=BUSY_TIMEOUT)
+            archive.row_factory = sqlite3.Row
+            try:
+                rows += [dict(row, archived=True) for row in archive.execute(query, params)]
+            except sqlite3.OperationalError as e:
+                print(f"Помилка читання архіву журналу: {e}")
+            finally:
+                archive.close()
+
+        rows.sort(key=lambda row: row["timestamp"] or "", reverse=True)
+        return rows[:limit]
+
+    @_query
     def get_recent_actions(self, limit=20):
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT file_name, action, user,
                            datetime(timestamp) as timestamp, details
                     FROM actions_log
-                    ORDER BY timestamp DESC
+                    ORDER BY id DESC
                     LIMIT ?
                 """, (limit,))
                 return [dict(row) for row in cursor.fetchall()]
@@ -178,18 +772,263 @@ class Database:
             print(f"Помилка отримання логів: {e}")
             return []
 
-    def get_all_processed_files(self):
+    def _keyset_page(self, table, columns, before_id=None, after_id=None, limit=10):
+        with self._connect() as conn:
+            if after_id is not None:
+                rows = conn.execute(
+                    f"SELECT id, {columns} FROM {table} WHERE id > ? ORDER BY id ASC LIMIT ?",
+                    (after_id, limit + 1)
+                ).fetchall()
+                has_newer = len(rows) > limit
+                if not has_newer and len(rows) < limit:
+                    return self._keyset_page(table, columns, limit=limit)
+                rows = rows[:limit][::-1]
+                has_older = bool(rows) and conn.execute(
+                    f"SELECT EXISTS(SELECT 1 FROM {table} WHERE id < ?)", (rows[-1]["id"],)
+                ).fetchone()[0]
+            else:
+                if before_id is None:
+                    rows = conn.execute(
+                        f"SELECT id, {columns} FROM {table} ORDER BY id DESC LIMIT ?",
+                        (limit + 1,)
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        f"SELECT id, {columns} FROM {table} WHERE id < ? ORDER BY id DESC LIMIT ?",
+                        (before_id, limit + 1)
+                    ).fetchall()
+                has_older = len(rows) > limit
+                rows = rows[:limit]
+                has_newer = bool(rows) and conn.execute(
+                    f"SELECT EXISTS(SELECT 1 FROM {table} WHERE id > ?)", (rows[0]["id"],)
+                ).fetchone()[0]
+
+        return {
+            "items": [dict(row) for row in rows],
+            "has_older": bool(has_older),
+            "has_newer": bool(has_newer),
+        }
+
+    @_query
+    def get_actions_page(self, before_id=None, after_id=None, limit=10):
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT file_name, approver, status,
-                           datetime(processed_at) as processed_at
-                    FROM processed_files
-                    ORDER BY processed_at DESC
+            return self._keyset_page(
+                "actions_log",
+                "file_name, action, user, datetime(timestamp) as timestamp, details",
+                before_id, after_id, limit
+            )
+        except Exception as e:
+            print(f"Помилка отримання логів: {e}")
+            return {"items": [], "has_older": False, "has_newer": False}
+
+    @_query
+    def get_processed_files_page(self, before_id=None, after_id=None, limit=10):
+        try:
+            return self._keyset_page(
+                "processed_files",
+                "file_name, approver, status, datetime(processed_at) as processed_at",
+                before_id, after_id, limit
+            )
+        except Exception as e:
+            print(f"Помилка отримання файлів: {e}")
+            return {"items": [], "has_older": False, "has_newer": False}
+
+    @_query
+    def get_processed_count(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT COALESCE(SUM(value), 0) FROM counters
+                WHERE name IN ('processed_files', 'processed_files_archived')
+            """).fetchone()
+            return row[0]
+
+    @_query
+    def reconcile_processed_count(self) -> int:
+        with self._connect() as conn:
+            actual = conn.execute("SELECT COUNT(*) FROM processed_files").fetchone()[0]
+            cursor = conn.execute(
+                "UPDATE counters SET value = ? WHERE name = 'processed_files' AND value != ?",
+                (actual, actual)
+            )
+        if cursor.rowcount:
+            print(f"🔄 Лічильник оброблених файлів виправлено: {actual}")
+        return actual
+
+    @_query
+    def add_quarantine(self, file_path, file_size, file_mtime_ns, reason=""):
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                    INSERT INTO quarantine
+                    (file_path, file_name, file_size, file_mtime_ns, reason, quarantined_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(file_path) DO UPDATE SET
+                        file_size = excluded.file_size,
+                        file_mtime_ns = excluded.file_mtime_ns,
+                        reason = excluded.reason,
+                        quarantined_at = excluded.quarantined_at
+                """, (file_path, Path(file_path).name, file_size, file_mtime_ns,
+                      reason, datetime.now().isoformat()))
+            return True
+        except Exception as e:
+            print(f"Помилка додавання в карантин: {e}")
+            return False
+
+    def get_quarantine(self):
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute("""
+                    SELECT file_path, file_name, file_size, file_mtime_ns, reason,
+                           datetime(quarantined_at) as quarantined_at
+                    FROM quarantine
+                    ORDER BY quarantined_at DESC
                 """)
                 return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
-            print(f"Помилка отримання файлів: {e}")
-            return []
\ No newline at end of file
+            print(f"Помилка читання карантину: {e}")
+            return []
+
+    @_query
+    def remove_quarantine(self, file_path):
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute("DELETE FROM quarantine WHERE file_path = ?", (file_path,))
+            return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Помилка видалення з карантину: {e}")
+            return False
+
+    def clear_quarantine(self) -> int:
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute("DELETE FROM quarantine")
+            return cursor.rowcount
+        except Exception as e:
+            print(f"Помилка очищення карантину: {e}")
+            return 0
+
+    @_query
+    def get_active_application(self, file_id):
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT data FROM active_applications WHERE file_id = ?", (file_id,)
+                ).fetchone()
+            return json.loads(row["data"]) if row else None
+        except Exception as e:
+            print(f"Помилка читання активної заявки: {e}")
+            return None
+
+    def get_active_applications(self, limit=None):
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute("""
+                    SELECT file_id, data
+                    FROM active_applications
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                """, (-1 if limit is None else limit,))
+                return [(row["file_id"], json.loads(row["data"])) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Помилка читання активних заявок: {e}")
+            return []
+
+    def get_unsent_applications(self):
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute("""
+                    SELECT file_id, data
+                    FROM active_applications
+                    WHERE sent_at IS NULL
+                    ORDER BY created_at
+                """)
+                return [(row["file_id"], json.loads(row["data"])) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Помилка читання невідправлених заявок: {e}")
+            return []
+
+    @_query
+    def delete_active_application(self, file_id):
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM active_applications WHERE file_id = ?", (file_id,))
+            return True
+        except Exception as e:
+            print(f"Помилка видалення активної заявки: {e}")
+            return False
+
+    @_query
+    def add_move_job(self, file_id, data, approved, user_name, chat_id, message_id):
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            cursor = conn.execute("""
+                INSERT INTO move_jobs
+                (file_id, file_path, approved, user_name, chat_id, message_id, payload,
+                 status, next_attempt_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'PENDING', ?, ?, ?)
+            """, (file_id, data["file_path"], int(approved), user_name, chat_id, message_id,
+                  json.dumps(data, ensure_ascii=False, default=str), datetime.now().timestamp(), now, now))
+            return cursor.lastrowid
+
+    @_query
+    def claim_due_move_jobs(self, now: float, limit: int = 10):
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT * FROM move_jobs
+                WHERE status = 'PENDING' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at
+                LIMIT ?
+            """, (now, limit)).fetchall()
+            conn.executemany(
+                "UPDATE move_jobs SET status = 'RUNNING', updated_at = ? WHERE id = ?",
+                [(datetime.now().isoformat(), row["id"]) for row in rows]
+            )
+
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job["approved"] = bool(job["approved"])
+            job["payload"] = json.loads(job["payload"])
+            jobs.append(job)
+        return jobs
+
+    def get_next_move_job_time(self):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM move_jobs WHERE status = 'PENDING'"
+            ).fetchone()
+            return row[0]
+
+    @_query
+    def complete_move_job(self, job_id):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE move_jobs SET status = 'DONE', last_error = NULL, updated_at = ? WHERE id = ?",
+                (datetime.now().isoformat(), job_id)
+            )
+
+    @_query
+    def retry_move_job(self, job_id, attempts, next_attempt_at, error):
+        with self._connect() as conn:
+            conn.execute("""
+                UPDATE move_jobs
+                SET status = 'PENDING', attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ?
+                WHERE id = ?
+            """, (attempts, next_attempt_at, error, datetime.now().isoformat(), job_id))
+
+    @_query
+    def fail_move_job(self, job_id, attempts, error):
+        with self._connect() as conn:
+            conn.execute("""
+                UPDATE move_jobs
+                SET status = 'FAILED', attempts = ?, last_error = ?, updated_at = ?
+                WHERE id = ?
+            """, (attempts, error, datetime.now().isoformat(), job_id))
+
+    def reset_running_move_jobs(self) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE move_jobs SET status = 'PENDING', updated_at = ? WHERE status = 'RUNNING'",
+                (datetime.now().isoformat(),)
+            )
+            return cursor.rowcount
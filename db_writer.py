@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+class BufferedWriter:
+
+    def __init__(self, db, flush_interval: float = 0.2, max_batch: int = 500):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._processed = []
+        self._actions = []
+        self._applications = []
+        self._active = []
+        self._sent = []
+        self._first_buffered = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def _buffered(self) -> int:
+        return (len(self._processed) + len(self._actions) + len(self._applications)
+                + len(self._active) + len(self._sent))
+
+    def _touch(self):
+        if self._first_buffered is None:
+            self._first_buffered = time.monotonic()
+            self._wakeup.set()
+
+    def add_processed_file(self, file_path, approver, file_hash=None):
+        file_hash = file_hash or self.db.get_file_hash(file_path)
+        row = (file_path, Path(file_path).name, file_hash, datetime.now().isoformat(), approver)
+        with self._lock:
+            self._processed.append(row)
+            self._touch()
+            full = self._buffered() >= self.max_batch
+        if full:
+            self.flush()
+
+    def log_action(self, file_name, action, user, details=""):
+        row = (file_name, action, user, datetime.now().isoformat(), details)
+        with self._lock:
+            self._actions.append(row)
+            self._touch()
+            full = self._buffered() >= self.max_batch
+        if full:
+            self.flush()
+
+    def save_application(self, data):
+        row = self.db.application_row(data)
+        with self._lock:
+            self._applications.append(row)
+            self._touch()
+            full = self._buffered() >= self.max_batch
+        if full:
+            self.flush()
+
+    def save_active_application(self, file_id, data):
+        row = (file_id, data["file_path"], json.dumps(data, ensure_ascii=False, default=str), datetime.now().isoformat())
+        with self._lock:
+            self._active.append(row)
+            self._touch()
+            full = self._buffered() >= self.max_batch
+        if full:
+            self.flush()
+
+    def mark_sent(self, file_id):
+        with self._lock:
+            self._sent.append((datetime.now().isoformat(), file_id))
+            self._touch()
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._buffered()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                processed, self._processed = self._processed, []
+                actions, self._actions = self._actions, []
+                applications, self._applications = self._applications, []
+                active, self._active = self._active, []
+                sent, self._sent = self._sent, []
+                self._first_buffered = None
+
+            written = len(processed) + len(actions) + len(applications) + len(active) + len(sent)
+            if not written:
+                return 0
+
+            if self.db.write_batch(processed, actions, applications, active, sent):
+                return written
+
+            with self._lock:
+                self._processed = processed + self._processed
+                self._actions = actions + self._actions
+                self._applications = applications + self._applications
+                self._active = active + self._active
+                self._sent = sent + self._sent
+                self._touch()
+            return 0
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while not self._stopping:
+                with self._lock:
+                    first = self._first_buffered
+                if first is None:
+                    break
+                delay = first + self.flush_interval - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                    continue
+                if not self.flush():
+                    time.sleep(self.flush_interval)
+
+    def close(self):
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        if self.pending():
+            print(f"⚠️ Не записано в БД при зупинці: {self.pending()} записів")
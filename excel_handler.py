@@ -1,9 +1,103 @@
+import multiprocessing
+import os
 import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from openpyxl import load_workbook
+from openpyxl.utils.cell import coordinate_to_tuple
 from datetime import datetime
 import config
-import time
+import metrics
+import xlsx_reader
+
+
+
+CELLS = {
+    "Бланк": ("B1", "E1", "H1", "C3", "G4", "B10", "C12"),
+    "Налаштування": ("B8",),
+}
+
+
+def parse_workbook(file_path, reader: str = "fast") -> dict:
+    if reader == "fast":
+        try:
+            return xlsx_reader.read_cells(str(file_path), CELLS)
+        except Exception as e:
+            print(f"⚠️ Швидке читання {Path(file_path).name} не вдалося ({e}), використовуємо openpyxl")
+    return parse_workbook_openpyxl(file_path)
+
+
+def _parse_timed(file_path, reader: str) -> tuple:
+    start = time.perf_counter()
+    record = parse_workbook(file_path, reader)
+    return record, time.perf_counter() - start
+
+
+def parse_amount(value) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    cleaned = str(value or "").replace("грн", "").replace("\u00a0", "").replace(" ", "").replace(",", ".")
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def parse_date(value) -> str | None:
+    if hasattr(value, "year") and hasattr(value, "month"):
+        return f"{value.year:04d}-{value.month:02d}-{value.day:02d}"
+    text = str(value or "").strip()
+    for fmt in ("%d.%m.%Y", "%d.%m.%y", "%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def cell_text(value):
+    if not value:
+        return "—"
+    if isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def parse_workbook_openpyxl(file_path) -> dict:
+    wb = load_workbook(str(file_path), data_only=True, read_only=True)
+    try:
+        record = {"sheetnames": list(wb.sheetnames), "cells": {}}
+
+        for sheet_name, refs in CELLS.items():
+            if sheet_name not in wb.sheetnames:
+                continue
+
+            positions = {ref: coordinate_to_tuple(ref) for ref in refs}
+            max_row = max(row for row, _ in positions.values())
+            max_col = max(col for _, col in positions.values())
+
+            rows = list(wb[sheet_name].iter_rows(
+                min_row=1, max_row=max_row, max_col=max_col, values_only=True
+            ))
+
+            for ref, (row, col) in positions.items():
+                value = None
+                if row <= len(rows) and col <= len(rows[row - 1]):
+                    value = rows[row - 1][col - 1]
+                record["cells"][f"{sheet_name}!{ref}"] = value
+
+        return record
+    finally:
+        try:
+            wb.close()
+        except:
+            pass
 
 
 class ExcelHandler:
@@ -14,6 +108,132 @@ class ExcelHandler:
         "Empty_form": "ДИРЕКТОР",
     }
 
+    REQUIRED_SHEETS = ("Бланк", "Налаштування")
+
+    CELLS = CELLS
+
+    def __init__(self, cache_size: int | None = None, workers: int | None = None):
+        self._cache = OrderedDict()
+        self._cache_size = cache_size or config.PARSE_CACHE_SIZE
+        self._cache_lock = threading.Lock()
+        self._workers = workers if workers is not None else config.PARSE_WORKERS
+        self._pool = None
+        self._move_listeners = []
+
+    def add_move_listener(self, callback):
+        self._move_listeners.append(callback)
+
+    def _notify_moved(self, src: Path, dst: Path):
+        for callback in self._move_listeners:
+            try:
+                callback(src, dst)
+            except Exception as e:
+                print(f"⚠️ Помилка обробника переміщення: {e}")
+
+    def _cache_key(self, file_path) -> tuple:
+        path = Path(file_path).resolve()
+        stat = path.stat()
+        return (str(path), stat.st_size, stat.st_mtime_ns)
+
+    def load_record(self, file_path) -> dict:
+        key = self._cache_key(file_path)
+
+        with self._cache_lock:
+            record = self._cache.get(key)
+            if record is not None:
+                self._cache.move_to_end(key)
+                return record
+
+        record = self._parse_workbook(file_path)
+        self._store_record(key, record)
+        return record
+
+    @metrics.timed("stage", stage="parse")
+    def _parse_workbook(self, file_path) -> dict:
+        return parse_workbook(file_path, config.XLSX_READER)
+
+    def _parse_openpyxl(self, file_path) -> dict:
+        return parse_workbook_openpyxl(file_path)
+
+    def _store_record(self, key: tuple, record: dict):
+        with self._cache_lock:
+            self._cache[key] = record
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _discard_pool(self, pool, error):
+        if self._pool is pool:
+            print(f"❌ Пул обробки файлів зупинився: {error}")
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _submit_all(self, pending) -> tuple:
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                return pool, {
+                    pool.submit(_parse_timed, fp, config.XLSX_READER): (fp, key)
+                    for fp, key in pending
+                }
+            except BrokenProcessPool as e:
+                self._discard_pool(pool, e)
+                if attempt:
+                    raise
+
+    def prefetch(self, file_paths):
+        pending = []
+        for fp in file_paths:
+            try:
+                key = self._cache_key(fp)
+            except OSError:
+                yield fp
+                continue
+            with self._cache_lock:
+                cached = key in self._cache
+            if cached:
+                yield fp
+            else:
+                pending.append((fp, key))
+
+        if len(pending) < 2 or self._workers < 2:
+            for fp, _ in pending:
+                yield fp
+            return
+
+        pool, futures = self._submit_all(pending)
+
+        for future in as_completed(futures):
+            fp, key = futures[future]
+            try:
+                record, elapsed = future.result()
+                metrics.observe("stage", elapsed, stage="parse")
+                if self._cache_key(fp) == key:
+                    self._store_record(key, record)
+            except BrokenProcessPool as e:
+                self._discard_pool(pool, e)
+                metrics.inc("stage_errors", stage="parse")
+            except Exception:
+                metrics.inc("stage_errors", stage="parse")
+            yield fp
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def has_required_sheets(self, record: dict) -> bool:
+        return all(sh in record["sheetnames"] for sh in self.REQUIRED_SHEETS)
+
+    @metrics.timed("stage", stage="lock_probe")
     def is_file_locked(self, file_path: str) -> bool:
         try:
             with open(file_path, "a"):
@@ -21,50 +241,53 @@ class ExcelHandler:
         except (PermissionError, OSError, IOError):
             return True
 
+    @metrics.timed("stage", stage="read_application")
     def read_application(self, file_path):
-        wb = None
         try:
             if self.is_file_locked(file_path):
                 return None
 
-            wb = load_workbook(file_path, data_only=True, read_only=True)
-            
-            if "Бланк" not in wb.sheetnames or "Налаштування" not in wb.sheetnames:
+            record = self.load_record(file_path)
+
+            if not self.has_required_sheets(record):
                 return None
 
-            blank = wb["Бланк"]
-            settings = wb["Налаштування"]
-            
-            status = settings["B8"].value
+            cells = record["cells"]
+
+            status = cells["Налаштування!B8"]
             approver = self.STATUS_MAP.get(status)
 
             if approver is None:
                 return None
 
-            raw_date = blank["B1"].value
+            raw_date = cells["Бланк!B1"]
             date_str = (raw_date.strftime("%d.%m.%Y") if hasattr(raw_date, "strftime")
                         else str(raw_date or "—").strip())
+            date_iso = parse_date(raw_date)
 
-            suma = blank["B10"].value or 0
-            try:
-                suma_str = f"{float(suma):,.2f}".replace(",", " ") + " грн"
-            except:
+            suma = cells["Бланк!B10"] or 0
+            amount = parse_amount(suma)
+            if amount is not None:
+                suma_str = f"{amount:,.2f}".replace(",", " ") + " грн"
+            else:
                 suma_str = f"{suma} грн"
 
-            payment_raw = blank["C3"].value or ""
+            payment_raw = cell_text(cells["Бланк!C3"]) if cells["Бланк!C3"] else ""
 
             data = {
                 "file_path": str(Path(file_path).resolve()),
                 "file_name": Path(file_path).name,
                 "дата": date_str,
-                "заявник": blank["E1"].value or "—",
-                "відділ": blank["H1"].value or "—",
+                "заявник": cell_text(cells["Бланк!E1"]),
+                "відділ": cell_text(cells["Бланк!H1"]),
                 "сума": suma_str,
-                "постачальник": blank["G4"].value or "—",
-                "призначення": blank["C12"].value or "—",
+                "постачальник": cell_text(cells["Бланк!G4"]),
+                "призначення": cell_text(cells["Бланк!C12"]),
                 "вид_розрахунку": payment_raw,
                 "intended_approver": approver,
                 "статус": status,
+                "amount": amount,
+                "date_iso": date_iso,
             }
             
             return data
@@ -72,14 +295,8 @@ class ExcelHandler:
         except Exception as e:
             print(f"Помилка читання {Path(file_path).name}: {e}")
             return None
-        
-        finally:
-            if wb is not None:
-                try:
-                    wb.close()
-                except:
-                    pass
 
+    @metrics.timed("stage", stage="move")
     def move_file(self, file_path, approved=True):
         src = Path(file_path)
         
@@ -87,6 +304,10 @@ class ExcelHandler:
             print(f"⚠️ Файл не існує: {src.name}")
             return True
 
+        if self.is_file_locked(src):
+            print(f"⏳ Файл зайнятий, переміщення буде повторено: {src.name}")
+            return False
+
         if not approved:
             dest_folder = config.get_path("rejected_folder")
             if not dest_folder:
@@ -100,10 +321,9 @@ class ExcelHandler:
             return self._safe_move(src, dest_path)
 
         try:
-            wb = load_workbook(str(src), data_only=True, read_only=True)
-            status = wb["Налаштування"]["B8"].value
-            payment_raw = str(wb["Бланк"]["C3"].value or "").strip().upper()
-            wb.close()
+            cells = self.load_record(src)["cells"]
+            status = cells["Налаштування!B8"]
+            payment_raw = str(cells["Бланк!C3"] or "").strip().upper()
         except Exception as e:
             print(f"❌ Помилка читання файлу при переміщенні: {e}")
             return False
@@ -169,7 +389,31 @@ class ExcelHandler:
 
         return self._safe_move(src, dest_path)
 
+    def _same_device(self, src: Path, dst_dir: Path) -> bool:
+        try:
+            return os.stat(src).st_dev == os.stat(dst_dir).st_dev
+        except OSError:
+            return False
+
     def _safe_move(self, src: Path, dst: Path) -> bool:
+        if self._same_device(src, dst.parent):
+            try:
+                os.replace(src, dst)
+                print(f"✅ Переміщено → {dst.parent.name}/{dst.name}")
+                self._notify_moved(src, dst)
+                return True
+            except FileNotFoundError:
+                print(f"❌ Файл зник перед переміщенням: {src.name}")
+                return False
+            except PermissionError:
+                print(f"⏳ Файл зайнятий, переміщення буде повторено: {src.name}")
+                return False
+            except OSError as e:
+                print(f"⚠️ Не вдалося перейменувати ({e}), використовуємо копіювання")
+
+        return self._copy_and_unlink(src, dst)
+
+    def _copy_and_unlink(self, src: Path, dst: Path) -> bool:
         try:
             shutil.copy2(str(src), str(dst))
             print(f"✅ Скопійовано → {dst.parent.name}/{dst.name}")
@@ -178,40 +422,17 @@ class ExcelHandler:
                 print(f"❌ Копія не створена!")
                 return False
 
-            max_attempts = 20
-            
-            for attempt in range(max_attempts):
-                try:
-                    src.unlink()
-                    print(f"🗑️ Оригінал видалено після {attempt + 1} спроби")
-                    return True
-                    
-                except PermissionError:
-                    if attempt < max_attempts - 1:
-                        time.sleep(0.5)
-                    else:
-                        import gc
-                        gc.collect()
-                        time.sleep(1)
-                        try:
-                            src.unlink()
-                            print(f"🗑️ Оригінал видалено після форсованого gc")
-                            return True
-                        except:
-                            pass
-                            
-                except FileNotFoundError:
-                    print(f"✅ Файл вже було видалено")
-                    return True
-                    
-                except Exception as e:
-                    print(f"⚠️ Непередбачена помилка при видаленні: {e}")
-                    break
-
-            print(f"⚠️ УВАГА: Файл скопійовано успішно, але оригінал залишився!")
-            print(f"   Можливо файл відкритий в Excel: {src.name}")
-            print(f"   Закрийте файл і видаліть вручну або перезапустіть бота")
-            
+            try:
+                src.unlink()
+                print(f"🗑️ Оригінал видалено")
+            except FileNotFoundError:
+                print(f"✅ Файл вже було видалено")
+            except PermissionError:
+                print(f"⏳ Оригінал зайнятий, переміщення буде повторено: {src.name}")
+                dst.unlink()
+                return False
+
+            self._notify_moved(src, dst)
             return True
 
         except Exception as e:
@@ -225,7 +446,6 @@ class ExcelHandler:
             return False
 
     def validate_file(self, file_path):
-        wb = None
         try:
             if not file_path.lower().endswith(('.xlsm', '.xlsx')):
                 return False, "Непідтримуваний формат"
@@ -233,17 +453,10 @@ class ExcelHandler:
             if not Path(file_path).exists():
                 return False, "Файл не знайдено"
 
-            wb = load_workbook(file_path, data_only=True, read_only=True)
-            has_sheets = all(sh in wb.sheetnames for sh in ["Бланк", "Налаштування"])
+            record = self.load_record(file_path)
+            has_sheets = self.has_required_sheets(record)
             
             return (True, "OK") if has_sheets else (False, "Немає потрібних аркушів")
             
         except Exception as e:
             return False, f"Помилка: {e}"
-        
-        finally:
-            if wb is not None:
-                try:
-                    wb.close()
-                except:
-                    pass
@@ -1,20 +1,246 @@
+import asyncio
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import config
-from database import Database
+import folder_watcher
+import metrics
+from database import Database, get_database
+from db_writer import BufferedWriter
 from excel_handler import ExcelHandler
+from folder_stats import MTIME_GRANULARITY, FolderStats
+from processed_index import ProcessedIndex
+from scheduler import ScanScheduler
+
+WATCHER_DEBOUNCE = 0.5
+OWNER_PREFIX = "~$"
+
+
+def owner_file_names(name: str) -> tuple:
+    lowered = name.lower()
+    return (OWNER_PREFIX + lowered, OWNER_PREFIX + lowered[2:])
 
 class FileMonitor:
     
-    def __init__(self):
-        self.db = Database()
-        self.excel = ExcelHandler()
+    def __init__(self, excel: ExcelHandler | None = None, db: Database | None = None):
+        self.db = db or get_database()
+        self.excel = excel or ExcelHandler()
         self.last_check = datetime.now()
         self.pending_files = {}
+        self.processed = ProcessedIndex(
+            self.db,
+            capacity=config.PROCESSED_INDEX_CAPACITY,
+            sync_interval=config.PROCESSED_INDEX_SYNC,
+        )
+        self.db.add_processed_listener(self.processed.add)
+        self.writer = BufferedWriter(
+            self.db,
+            flush_interval=config.DB_FLUSH_INTERVAL_MS / 1000,
+            max_batch=config.DB_FLUSH_BATCH,
+        )
+        self.folder_stats = FolderStats(verify_interval=config.WATCHER_RESCAN_INTERVAL)
+        self.schedule = ScanScheduler(
+            floor=config.SCAN_INTERVAL_MIN,
+            ceiling=config.SCAN_INTERVAL_MAX,
+            backoff=config.SCAN_BACKOFF,
+            business_hours=config.BUSINESS_HOURS,
+            business_days=config.BUSINESS_DAYS,
+            business_interval=config.BUSINESS_SCAN_INTERVAL,
+        )
+        self.excel.add_move_listener(self.folder_stats.moved)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="monitor")
+        self._scan_lock = asyncio.Lock()
+        self.watcher = None
+        self._loop = None
+        self._change_event = None
+        self._dirty_folders = set()
+        self._dirty_all = False
+        self._dirty_lock = threading.Lock()
+        self._events_reliable = {}
+        self._event_stats = {}
+        self._polled_folders = set()
+        self._watched_folders = set()
+        self._last_full_scan = 0.0
+        self._resolved_folders = {}
+        self._folder_snapshots = {}
+        self.quarantine = {}
+        self._quarantine_lock = threading.Lock()
+
+    def _resolve_folder(self, folder: str) -> Path:
+        resolved = self._resolved_folders.get(folder)
+        if resolved is None:
+            resolved = Path(folder).resolve()
+            self._resolved_folders[folder] = resolved
+        return resolved
+
+    def _folder_unchanged(self, folder: str, dir_stat) -> bool:
+        snapshot = self._folder_snapshots.get(folder)
+        if snapshot is None:
+            return False
+        if snapshot["signature"] != (dir_stat.st_mtime_ns, dir_stat.st_size, dir_stat.st_nlink):
+            return False
+        return dir_stat.st_mtime_ns / 1e9 < snapshot["listed_at"] - MTIME_GRANULARITY
+
+    def _list_workbooks(self, folder_path: Path) -> list:
+        entries = []
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                if not entry.name.lower().endswith((".xlsm", ".xlsx")):
+                    continue
+                try:
+                    if entry.is_file():
+                        entries.append(entry)
+                except OSError:
+                    continue
+        return entries
+
+    def start_watching(self):
+        self._loop = asyncio.get_running_loop()
+        self._change_event = asyncio.Event()
+
+        backend = config.WATCHER_BACKEND
+        if backend == "polling":
+            print("🔁 Моніторинг папок: опитування кожні "
+                  f"{config.CHECK_INTERVAL} сек")
+            return
+
+        if not folder_watcher.inotify_supported():
+            print("🔁 inotify недоступний, моніторинг папок опитуванням")
+            return
+
+        try:
+            self.watcher = folder_watcher.InotifyWatcher(self._on_folder_event)
+            self.watcher.start()
+            print("👁️ Моніторинг папок: inotify")
+        except OSError as e:
+            print(f"⚠️ Не вдалося запустити inotify ({e}), використовуємо опитування")
+            self.watcher = None
+
+    def _on_folder_event(self, folder, name, mask):
+        if name is not None and not name.lower().endswith((".xlsm", ".xlsx")):
+            return
+
+        if folder is not None and name is not None:
+            path = os.path.join(folder, name)
+            if mask & (folder_watcher.IN_DELETE | folder_watcher.IN_MOVED_FROM):
+                self._event_stats.pop(path, None)
+            elif mask & folder_watcher.IN_CLOSE_WRITE:
+                try:
+                    stat = os.stat(path)
+                    signature = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    signature = None
+                if signature is not None and self._event_stats.get(path) == signature:
+                    return
+                self._event_stats[path] = signature
+
+        with self._dirty_lock:
+            if folder is None:
+                self._dirty_all = True
+            else:
+                self._dirty_folders.add(folder)
+
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._change_event.set)
+
+    def _sync_watches(self, folders) -> tuple:
+        if self.watcher is None:
+            return set(), set()
+
+        watched = set()
+        added = set()
+        already = self.watcher.watched
+
+        for folder in folders:
+            if not folder or not Path(folder).is_dir():
+                continue
+
+            if folder not in self._events_reliable:
+                reliable = config.WATCHER_BACKEND == "inotify" or folder_watcher.events_reliable(folder)
+                self._events_reliable[folder] = reliable
+                if not reliable:
+                    print(f"🔁 {folder}: мережева папка, використовуємо опитування")
+
+            if self._events_reliable[folder] and self.watcher.watch(folder):
+                watched.add(folder)
+                if folder not in already:
+                    added.add(folder)
+
+        for stale in already - watched:
+            self.watcher.unwatch(stale)
+
+        return watched, added
 
-    def check_folders(self):
+    def _has_pending_in(self, folder_path: Path) -> bool:
+        return any(Path(fp).parent == folder_path for fp in self.pending_files)
+
+    def next_scan_delay(self) -> float:
+        now = time.time()
+        delay = config.WATCHER_RESCAN_INTERVAL - (now - self._last_full_scan)
+
+        if self._polled_folders:
+            polled_delay = self.schedule.next_delay(self._polled_folders, now)
+            if polled_delay is not None:
+                delay = min(delay, polled_delay)
+
+        for pending in self.pending_files.values():
+            if pending["locked"]:
+                delay = min(delay, config.CHECK_INTERVAL)
+            else:
+                delay = min(delay, config.FILE_SETTLE_TIME - (now - pending["stable_since"]))
+
+        return max(delay, WATCHER_DEBOUNCE)
+
+    async def wait_for_changes(self, timeout: float):
+        if self._change_event is None:
+            await asyncio.sleep(timeout)
+            return
+
+        try:
+            await asyncio.wait_for(self._change_event.wait(), timeout)
+            await asyncio.sleep(WATCHER_DEBOUNCE)
+        except asyncio.TimeoutError:
+            pass
+        self._change_event.clear()
+
+    async def scan(self):
+        return [app async for app in self.scan_iter()]
+
+    async def scan_iter(self):
+        async with self._scan_lock:
+            loop = asyncio.get_running_loop()
+            queue = asyncio.Queue()
+            finished = object()
+
+            def emit(app):
+                loop.call_soon_threadsafe(queue.put_nowait, app)
+
+            future = loop.run_in_executor(self._executor, self.check_folders, emit)
+            future.add_done_callback(lambda _: queue.put_nowait(finished))
+
+            while True:
+                app = await queue.get()
+                if app is finished:
+                    break
+                yield app
+
+            await future
+
+    def shutdown(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        self._executor.shutdown(wait=True)
+        self.writer.close()
+        self.excel.shutdown()
+        self.db.close()
+
+    @metrics.timed("stage", stage="check_folders")
+    def check_folders(self, on_application=None):
         new_apps = []
+        ready = []
         
         folders = {
             "ДИРЕКТОР": config.get_path("director_folder"),
@@ -23,69 +249,264 @@ class FileMonitor:
 
         current_time = time.time()
 
+        if not self.processed.warmed:
+            self.processed.warm()
+            quarantine = {
+                item["file_path"]: (item["file_size"], item["file_mtime_ns"])
+                for item in self.db.get_quarantine()
+            }
+            with self._quarantine_lock:
+                self.quarantine = quarantine
+        self.processed.sync()
+
+        watched, newly_watched = self._sync_watches(folders.values())
+        self._watched_folders = watched
+        with self._dirty_lock:
+            dirty = self._dirty_folders | newly_watched
+            full_scan = self._dirty_all
+            self._dirty_folders = set()
+            self._dirty_all = False
+
+        if current_time - self._last_full_scan >= config.WATCHER_RESCAN_INTERVAL:
+            full_scan = True
+            self._last_full_scan = current_time
+            self.db.reconcile_processed_count()
+
+        self._polled_folders = set()
+        scan_started = time.perf_counter()
+
         for approver, folder in folders.items():
             if not folder:
                 continue
             
-            folder_path = Path(folder)
-            if not folder_path.exists():
+            folder_path = self._resolve_folder(folder)
+            polled = folder not in watched
+            forced = full_scan or self._has_pending_in(folder_path)
+
+            if polled:
+                self._polled_folders.add(folder)
+                if not forced and not self.schedule.due(folder, current_time):
+                    continue
+            else:
+                self.schedule.forget(folder)
+
+            try:
+                dir_stat = os.stat(folder_path)
+            except OSError:
                 print(f"⚠️ Папка не існує: {folder}")
+                self._folder_snapshots.pop(folder, None)
+                if polled:
+                    self.schedule.record(folder, False, current_time, label=approver)
                 continue
 
-            for pattern in ["*.xlsm", "*.xlsx"]:
-                for file in folder_path.glob(pattern):
-                    fp = str(file.resolve())
-
-                    if self.excel.is_file_locked(fp):
+            if not forced:
+                if not polled:
+                    if folder not in dirty:
                         continue
+                elif self._folder_unchanged(folder, dir_stat):
+                    self.schedule.record(folder, False, current_time, label=approver)
+                    continue
 
-                    if self.db.is_file_processed(fp):
-                        self.pending_files.pop(fp, None)
-                        continue
+            previous = self._folder_snapshots.get(folder)
+            signature = (dir_stat.st_mtime_ns, dir_stat.st_size, dir_stat.st_nlink)
+            listed_at = time.time()
+            entries = self._list_workbooks(folder_path)
+            self._folder_snapshots[folder] = {
+                "signature": signature,
+                "entries": len(entries),
+                "listed_at": listed_at,
+            }
+            self.folder_stats.observe(folder_path, dir_stat, len(entries), listed_at)
 
-                    if fp not in self.pending_files:
-                        print(f"🔍 Виявлено новий файл: {file.name} [{approver}]")
-                        self.pending_files[fp] = current_time
-                        continue
+            owners = {entry.name.lower() for entry in entries if entry.name.startswith(OWNER_PREFIX)}
 
-                    time_since_first_seen = current_time - self.pending_files[fp]
-                    
-                    if time_since_first_seen < config.FILE_SETTLE_TIME:
-                        continue
+            candidates = []
+            for entry in entries:
+                if entry.name.startswith(OWNER_PREFIX):
+                    continue
 
-                    print(f"📄 Обробка файлу: {file.name} [{approver}]")
-                    
-                    valid, error = self.excel.validate_file(fp)
-                    if not valid:
-                        print(f"❌ Файл не валідний: {error}")
-                        self.pending_files.pop(fp, None)
-                        continue
+                fp = os.path.join(str(folder_path), entry.name)
 
-                    data = self.excel.read_application(fp)
-                    
-                    if data:
-                        data["intended_approver"] = approver
-                        new_apps.append(data)
-                        self.db.add_processed_file(fp, approver)
-                        
-                        self.db.log_action(
-                            data["file_name"], 
-                            "DETECTED", 
-                            "monitor", 
-                            f"Сума: {data['сума']}, Погоджує: {approver}"
-                        )
-                        
-                        print(f"✅ Заявка додана: {data['file_name']} ({approver})")
-                    else:
-                        print(f"⚠️ Не вдалося прочитати файл: {file.name}")
-                    
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+
+                if self.quarantine.get(fp) == (stat.st_size, stat.st_mtime_ns):
                     self.pending_files.pop(fp, None)
+                    continue
+
+                file_hash = Database.make_file_hash(fp, stat.st_size, stat.st_mtime)
+                candidates.append((entry.name, fp, file_hash, stat))
+
+            processed = self.processed.filter_processed(
+                [c[1] for c in candidates], [c[2] for c in candidates]
+            )
+
+            for name, fp, file_hash, stat in candidates:
+                if fp in processed:
+                    self.pending_files.pop(fp, None)
+                    continue
+
+                signature = (stat.st_size, stat.st_mtime_ns)
+                pending = self.pending_files.get(fp)
+
+                if pending is None:
+                    print(f"🔍 Виявлено новий файл: {name} [{approver}]")
+                    metrics.inc("files_detected", approver=approver)
+                    self.pending_files[fp] = {
+                        "first_seen": current_time,
+                        "stable_since": current_time,
+                        "signature": signature,
+                        "locked": False,
+                    }
+                    continue
+
+                if pending["signature"] != signature:
+                    pending["signature"] = signature
+                    pending["stable_since"] = current_time
+                    pending["locked"] = False
+                    continue
 
+                if current_time - pending["stable_since"] < config.FILE_SETTLE_TIME:
+                    continue
+
+                if any(owner in owners for owner in owner_file_names(name)):
+                    pending["locked"] = "owner"
+                    metrics.inc("lock_busy", reason="owner_file")
+                    continue
+
+                if self.excel.is_file_locked(fp):
+                    pending["locked"] = "probe"
+                    metrics.inc("lock_busy", reason="probe")
+                    continue
+
+                pending["locked"] = False
+                ready.append((approver, name, fp, file_hash, stat))
+
+            if polled:
+                activity = previous is not None and previous["signature"] != signature
+                self.schedule.record(folder, activity or self._has_pending_in(folder_path),
+                                     current_time, label=approver)
+
+        metrics.observe("stage", time.perf_counter() - scan_started, stage="scan")
+
+        if full_scan:
+            self._refresh_folder_counts()
+            self._prune_quarantine()
+
+        if ready:
+            self.processed.sync(force=True)
+            already = self.processed.filter_processed(
+                [item[2] for item in ready], [item[3] for item in ready]
+            )
+            for fp in already:
+                self.pending_files.pop(fp, None)
+            ready = [item for item in ready if item[2] not in already]
+
+        ready_by_path = {item[2]: item for item in ready}
+
+        for fp in self.excel.prefetch(ready_by_path):
+            approver, name, _, file_hash, stat = ready_by_path[fp]
+
+            print(f"📄 Обробка файлу: {name} [{approver}]")
+            
+            valid, error = self.excel.validate_file(fp)
+            if not valid:
+                print(f"❌ Файл не валідний: {error}")
+                self._quarantine_file(fp, stat, error)
+                self.pending_files.pop(fp, None)
+                continue
+
+            data = self.excel.read_application(fp)
+            
+            if data:
+                data["intended_approver"] = approver
+
+                try:
+                    self.writer.save_active_application(Database.make_file_id(fp), data)
+                    self.writer.save_application(data)
+                    self.writer.add_processed_file(fp, approver, file_hash)
+                    self.writer.log_action(
+                        data["file_name"], 
+                        "DETECTED", 
+                        "monitor", 
+                        f"Сума: {data['сума']}, Погоджує: {approver}"
+                    )
+                except Exception as e:
+                    print(f"❌ Не вдалося зберегти заявку {name}: {e}")
+                    self._quarantine_file(fp, stat, "Не вдалося зберегти заявку")
+                    self.pending_files.pop(fp, None)
+                    continue
+
+                new_apps.append(data)
+
+                if on_application is not None:
+                    on_application(data)
+                
+                print(f"✅ Заявка додана: {data['file_name']} ({approver})")
+                self._release_quarantine(fp)
+            else:
+                print(f"⚠️ Не вдалося прочитати файл: {name}")
+                if not self.excel.is_file_locked(fp):
+                    self._quarantine_file(fp, stat, "Не вдалося прочитати заявку")
+            
+            self.pending_files.pop(fp, None)
+
+        self.writer.flush()
         self._cleanup_pending_files()
         self.last_check = datetime.now()
 
         return new_apps
 
+    def _refresh_folder_counts(self):
+        for key, path in config.PATHS.items():
+            if key.endswith("_folder") and path:
+                self.folder_stats.refresh(self._resolve_folder(path))
+
+    def _prune_quarantine(self):
+        with self._quarantine_lock:
+            paths = list(self.quarantine)
+        gone = [
+            fp for fp in paths
+            if os.path.isdir(os.path.dirname(fp)) and not os.path.exists(fp)
+        ]
+        for fp in gone:
+            self._release_quarantine(fp)
+        if gone:
+            print(f"🧹 Прибрано з карантину зниклих файлів: {len(gone)}")
+
+    def _quarantine_file(self, fp: str, stat, reason: str):
+        with self._quarantine_lock:
+            self.quarantine[fp] = (stat.st_size, stat.st_mtime_ns)
+        self.db.add_quarantine(fp, stat.st_size, stat.st_mtime_ns, reason)
+        print(f"🚫 Файл у карантині до зміни вмісту: {Path(fp).name}")
+
+    def _release_quarantine(self, fp: str):
+        with self._quarantine_lock:
+            released = self.quarantine.pop(fp, None) is not None
+        if released:
+            self.db.remove_quarantine(fp)
+
+    def get_quarantine(self):
+        return self.db.get_quarantine()
+
+    def clear_quarantine(self, file_path: str | None = None) -> int:
+        if file_path is None:
+            removed = self.db.clear_quarantine()
+            with self._quarantine_lock:
+                self.quarantine.clear()
+        else:
+            removed = 1 if self.db.remove_quarantine(file_path) else 0
+            with self._quarantine_lock:
+                self.quarantine.pop(file_path, None)
+
+        with self._dirty_lock:
+            self._dirty_all = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._change_event.set)
+        return removed
+
     def _cleanup_pending_files(self):
         files_to_remove = []
         
@@ -101,26 +522,22 @@ class FileMonitor:
         stats = {
             "last_check": self.last_check.strftime("%H:%M:%S"),
             "pending_files": len(self.pending_files),
-            "folders": {}
+            "processed_total": self.db.get_processed_count(),
+            "folders": {},
+            "schedule": self.schedule.snapshot(),
+            "business_hours": self.schedule.in_business_hours(),
+            "watched": len(self._watched_folders),
         }
         
         for key, path in config.PATHS.items():
             if key.endswith("_folder") and path:
-                folder_path = Path(path)
-                exists = folder_path.exists()
-                
-                if exists:
-                    xlsm_count = len(list(folder_path.glob("*.xlsm")))
-                    xlsx_count = len(list(folder_path.glob("*.xlsx")))
-                    total_count = xlsm_count + xlsx_count
-                else:
-                    total_count = 0
+                folder_path = self._resolve_folder(path)
                 
                 folder_name = key.replace("_folder", "").replace("_", " ").title()
                 
                 stats["folders"][folder_name] = {
-                    "exists": exists,
-                    "files": total_count,
+                    "exists": folder_path.is_dir(),
+                    "files": self.folder_stats.count(folder_path),
                     "path": path
                 }
         
@@ -137,12 +554,15 @@ class FileMonitor:
         info = []
         current_time = time.time()
         
-        for fp, first_seen in self.pending_files.items():
-            time_waiting = current_time - first_seen
+        for fp, pending in list(self.pending_files.items()):
+            time_waiting = current_time - pending["first_seen"]
+            time_stable = current_time - pending["stable_since"]
             info.append({
                 "file": Path(fp).name,
                 "waiting": f"{time_waiting:.1f}s",
-                "ready_in": f"{max(0, config.FILE_SETTLE_TIME - time_waiting):.1f}s"
+                "stable": f"{time_stable:.1f}s",
+                "locked": pending["locked"],
+                "ready_in": f"{max(0, config.FILE_SETTLE_TIME - time_stable):.1f}s"
             })
         
         return info
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+MTIME_GRANULARITY = 2.0
+FINE_MTIME_GRANULARITY = 0.05
+WORKBOOK_SUFFIXES = (".xlsm", ".xlsx")
+
+
+def _signature(dir_stat) -> tuple:
+    return (dir_stat.st_mtime_ns, dir_stat.st_size, dir_stat.st_nlink)
+
+
+def mtime_granularity(mtime_ns: int) -> float:
+    return FINE_MTIME_GRANULARITY if mtime_ns % 1_000_000_000 else MTIME_GRANULARITY
+
+
+def count_workbooks(folder) -> int:
+    count = 0
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not entry.name.lower().endswith(WORKBOOK_SUFFIXES):
+                continue
+            try:
+                if entry.is_file():
+                    count += 1
+            except OSError:
+                continue
+    return count
+
+
+class FolderStats:
+
+    def __init__(self, verify_interval: float = 300):
+        self.verify_interval = verify_interval
+        self.recounts = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, entry: dict, dir_stat) -> bool:
+        if entry["signature"] != _signature(dir_stat):
+            return False
+        if dir_stat.st_mtime_ns / 1e9 >= entry["counted_at"] - mtime_granularity(dir_stat.st_mtime_ns):
+            return False
+        return time.monotonic() - entry["verified_at"] < self.verify_interval
+
+    def observe(self, folder, dir_stat, count: int, listed_at: float | None = None):
+        with self._lock:
+            self._entries[str(folder)] = {
+                "signature": _signature(dir_stat),
+                "count": count,
+                "counted_at": listed_at or time.time(),
+                "verified_at": time.monotonic(),
+            }
+
+    def count(self, folder) -> int | None:
+        with self._lock:
+            entry = self._entries.get(str(folder))
+            return None if entry is None else entry["count"]
+
+    def refresh(self, folder) -> int | None:
+        folder = str(folder)
+        try:
+            dir_stat = os.stat(folder)
+        except OSError:
+            with self._lock:
+                self._entries.pop(folder, None)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(folder)
+            if entry is not None and self._fresh(entry, dir_stat):
+                return entry["count"]
+
+        listed_at = time.time()
+        try:
+            count = count_workbooks(folder)
+        except OSError:
+            return None
+        self.recounts += 1
+        self.observe(folder, dir_stat, count, listed_at)
+        return count
+
+    def moved(self, src: Path, dst: Path):
+        for folder, delta in ((src.parent, -1), (dst.parent, 1)):
+            key = str(folder.resolve())
+            try:
+                dir_stat = os.stat(key)
+            except OSError:
+                continue
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                granularity = mtime_granularity(dir_stat.st_mtime_ns)
+                entry["count"] = max(0, entry["count"] + delta)
+                entry["signature"] = _signature(dir_stat)
+                entry["counted_at"] = time.time()
+                if granularity == FINE_MTIME_GRANULARITY:
+                    entry["counted_at"] += granularity
+
+    def invalidate(self, folder=None):
+        with self._lock:
+            if folder is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(folder), None)
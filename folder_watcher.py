@@ -0,0 +1,164 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+NETWORK_FILESYSTEMS = {
+    "cifs", "smb3", "smbfs", "nfs", "nfs4", "ncpfs", "afs", "9p",
+    "ceph", "glusterfs", "davfs", "sshfs", "drvfs",
+}
+
+_EVENT = struct.Struct("iIII")
+
+
+def inotify_supported() -> bool:
+    return sys.platform.startswith("linux") and ctypes.util.find_library("c") is not None
+
+
+def filesystem_type(path: str) -> str | None:
+    try:
+        real = os.path.realpath(path)
+        best, fstype = "", None
+        with open("/proc/mounts", encoding="utf-8") as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount_point = parts[1].replace("\\040", " ")
+                if (real == mount_point or real.startswith(mount_point.rstrip("/") + "/")) \
+                        and len(mount_point) > len(best):
+                    best, fstype = mount_point, parts[2]
+        return fstype
+    except OSError:
+        return None
+
+
+def events_reliable(path: str) -> bool:
+    fstype = filesystem_type(path)
+    if fstype is None:
+        return False
+    return fstype not in NETWORK_FILESYSTEMS and not fstype.startswith("fuse")
+
+
+class InotifyWatcher:
+
+    def __init__(self, on_change):
+        self.on_change = on_change
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+        self._wake_r, self._wake_w = os.pipe()
+        self._watches = {}
+        self._paths = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def watched(self) -> set:
+        with self._lock:
+            return set(self._paths)
+
+    def watch(self, path: str) -> bool:
+        with self._lock:
+            if path in self._paths:
+                return True
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            print(f"⚠️ inotify не може стежити за {path}: {os.strerror(err)}")
+            return False
+        with self._lock:
+            self._watches[wd] = path
+            self._paths[path] = wd
+        return True
+
+    def unwatch(self, path: str):
+        with self._lock:
+            wd = self._paths.pop(path, None)
+            if wd is not None:
+                self._watches.pop(wd, None)
+        if wd is not None:
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="inotify", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                readable, _, _ = select.select([self._fd, self._wake_r], [], [])
+            except InterruptedError:
+                continue
+            if self._wake_r in readable or self._stopping:
+                break
+            try:
+                buffer = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                print(f"❌ Помилка читання inotify: {e}")
+                break
+            self._dispatch(buffer)
+
+    def _dispatch(self, buffer: bytes):
+        offset = 0
+        while offset + _EVENT.size <= len(buffer):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buffer, offset)
+            offset += _EVENT.size
+            name = buffer[offset:offset + length].rstrip(b"\0").decode("utf-8", "surrogateescape")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.on_change(None, None, mask)
+                continue
+
+            with self._lock:
+                path = self._watches.get(wd)
+                if mask & IN_IGNORED and path is not None:
+                    self._watches.pop(wd, None)
+                    self._paths.pop(path, None)
+
+            if path is not None:
+                self.on_change(path, name or None, mask)
@@ -0,0 +1,202 @@
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+PREFIX = "exelbot_"
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Histogram:
+
+    __slots__ = ("buckets", "count", "sum", "max")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Registry:
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _label_key(labels))
+        index = bisect_left(self.bounds, seconds)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = _Histogram(len(self.bounds) + 1)
+                self._histograms[key] = hist
+            hist.buckets[index] += 1
+            hist.count += 1
+            hist.sum += seconds
+            if seconds > hist.max:
+                hist.max = seconds
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+            if outcome == "error":
+                self.inc(f"{name}_errors", **labels)
+
+    def timed(self, name: str, **labels):
+        def decorator(fn):
+            if asyncio.iscoroutinefunction(fn):
+                @wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(name, **labels):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (list(h.buckets), h.count, h.sum, h.max)
+                for key, h in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def render(self) -> str:
+        snap = self.snapshot()
+        lines = []
+
+        for name in sorted({name for name, _ in snap["counters"]}):
+            metric = f"{PREFIX}{name}_total"
+            if name in self._help:
+                lines.append(f"# HELP {metric} {self._help[name]}")
+            lines.append(f"# TYPE {metric} counter")
+            for (n, key), value in sorted(snap["counters"].items()):
+                if n == name:
+                    lines.append(f"{metric}{_format_labels(key)} {value}")
+
+        for name in sorted({name for name, _ in snap["histograms"]}):
+            metric = f"{PREFIX}{name}_seconds"
+            if name in self._help:
+                lines.append(f"# HELP {metric} {self._help[name]}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (n, key), (buckets, count, total, _max) in sorted(snap["histograms"].items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, hits in zip(self.bounds, buckets):
+                    cumulative += hits
+                    lines.append(f"{metric}_bucket{_format_labels(key, (('le', repr(float(bound))),))} {cumulative}")
+                lines.append(f"{metric}_bucket{_format_labels(key, (('le', '+Inf'),))} {count}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {total:.6f}")
+                lines.append(f"{metric}_count{_format_labels(key)} {count}")
+
+        lines.append(f"# TYPE {PREFIX}start_time_seconds gauge")
+        lines.append(f"{PREFIX}start_time_seconds {self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def _quantile(self, buckets: list, count: int, q: float) -> float:
+        rank = q * count
+        seen = 0
+        for bound, hits in zip(self.bounds + (float("inf"),), buckets):
+            seen += hits
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self) -> list:
+        snap = self.snapshot()
+        rows = []
+        for (name, key), (buckets, count, total, peak) in sorted(snap["histograms"].items()):
+            if not count:
+                continue
+            label = name + "".join(f" {v}" for _, v in key)
+            rows.append({
+                "stage": label,
+                "count": count,
+                "avg_ms": total / count * 1000,
+                "p95_ms": min(self._quantile(buckets, count, 0.95), peak) * 1000,
+                "max_ms": peak * 1000,
+                "errors": snap["counters"].get((f"{name}_errors", key), 0),
+            })
+        return rows
+
+    def counters(self) -> list:
+        snap = self.snapshot()
+        return [
+            (name + "".join(f" {v}" for _, v in key), value)
+            for (name, key), value in sorted(snap["counters"].items())
+            if not name.endswith("_errors")
+        ]
+
+    def write_textfile(self, path: str):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(self.render())
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+describe = REGISTRY.describe
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+render = REGISTRY.render
+summary = REGISTRY.summary
+counters = REGISTRY.counters
+write_textfile = REGISTRY.write_textfile
+
+describe("stage", "Тривалість етапів обробки заявок")
+describe("db", "Тривалість запитів до SQLite")
+describe("telegram_send", "Тривалість виклику sendMessage")
+describe("files_detected", "Нові файли, знайдені сканером")
+describe("lock_busy", "Файли, пропущені через блокування")
+describe("notifications", "Результати доставки повідомлень")
+describe("moves", "Результати переміщення файлів")
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MoveQueue:
+
+    def __init__(self, db, excel, max_attempts: int = 8,
+                 base_delay: float = 2, max_delay: float = 300):
+        self.db = db
+        self.excel = excel
+        self.on_finished = None
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._destinations = {}
+        excel.add_move_listener(self._moved)
+
+    def _moved(self, src: Path, dst: Path):
+        self._destinations[str(src)] = os.path.join(str(dst.parent.resolve()), dst.name)
+
+    def submit(self, file_id, data, approved: bool, user_name: str, chat_id: int, message_id: int):
+        job_id = self.db.add_move_job(file_id, data, approved, user_name, chat_id, message_id)
+        self._wakeup.set()
+        return job_id
+
+    def start(self, on_finished):
+        self.on_finished = on_finished
+        restored = self.db.reset_running_move_jobs()
+        if restored:
+            logger.info(f"Відновлено незавершених переміщень: {restored}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                self._wakeup.clear()
+                jobs = self.db.claim_due_move_jobs(time.time())
+                for job in jobs:
+                    await self._process(job)
+
+                if jobs:
+                    continue
+
+                next_due = self.db.get_next_move_job_time()
+                timeout = 60 if next_due is None else max(0.1, next_due - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), min(timeout, 60))
+                except asyncio.TimeoutError:
+                    pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Помилка черги переміщень: {e}", exc_info=True)
+                await asyncio.sleep(5)
+
+    async def _process(self, job: dict):
+        data = job["payload"]
+        try:
+            success = await asyncio.to_thread(self.excel.move_file, job["file_path"], job["approved"])
+            error = None if success else "move_file повернув помилку"
+        except Exception as e:
+            success, error = False, str(e)
+
+        moved_to = self._destinations.pop(str(Path(job["file_path"])), None)
+
+        if success:
+            job["moved_to"] = moved_to
+            self.db.complete_move_job(job["id"])
+            metrics.inc("moves", result="done")
+            await self._notify(job, data, True)
+            return
+
+        attempts = job["attempts"] + 1
+        if attempts >= self.max_attempts:
+            self.db.fail_move_job(job["id"], attempts, error)
+            metrics.inc("moves", result="failed")
+            logger.error(f"Переміщення {data['file_name']} не вдалося після {attempts} спроб: {error}")
+            await self._notify(job, data, False)
+            return
+
+        delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+        self.db.retry_move_job(job["id"], attempts, time.time() + delay, error)
+        metrics.inc("moves", result="retry")
+        logger.warning(f"Переміщення {data['file_name']} відкладено на {delay:.0f} сек (спроба {attempts})")
+
+    async def _notify(self, job: dict, data: dict, success: bool):
+        try:
+            await self.on_finished(job, data, success)
+        except Exception as e:
+            logger.error(f"Помилка обробки результату переміщення: {e}", exc_info=True)
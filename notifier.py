@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import random
+import time
+
+import metrics
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block(self, seconds: float):
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self._refill(now)
+        self.tokens = 0
+        self.updated = self.blocked_until
+
+
+class NotificationQueue:
+
+    def __init__(self, bot, global_rate: float = 30, chat_rate: float = 1, chat_burst: float = 3,
+                 group_rate: float = 20 / 60, max_attempts: int = 5):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_attempts = max_attempts
+        self._global = TokenBucket(global_rate, global_rate)
+        self._buckets = {}
+        self._queues = {}
+        self._workers = {}
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = TokenBucket(rate, self.chat_burst)
+            self._buckets[chat_id] = bucket
+        return bucket
+
+    def submit(self, chat_id: int, text: str, label: str = "", on_sent=None, **kwargs):
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = asyncio.Queue()
+            self._queues[chat_id] = queue
+        queue.put_nowait((text, label, on_sent, kwargs))
+
+        worker = self._workers.get(chat_id)
+        if worker is None or worker.done():
+            self._workers[chat_id] = asyncio.create_task(self._worker(chat_id, queue))
+
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def _worker(self, chat_id: int, queue: asyncio.Queue):
+        while True:
+            text, label, on_sent, kwargs = await queue.get()
+            try:
+                if await self._deliver(chat_id, text, label, kwargs) and on_sent is not None:
+                    on_sent()
+            except Exception as e:
+                logger.error(f"Помилка доставки {label} у чат {chat_id}: {e}", exc_info=True)
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, chat_id: int, text: str, label: str, kwargs: dict) -> bool:
+        bucket = self._bucket(chat_id)
+
+        for attempt in range(1, self.max_attempts + 1):
+            await bucket.acquire()
+            await self._global.acquire()
+
+            try:
+                with metrics.timer("telegram_send"):
+                    await self.bot.send_message(chat_id, text, **kwargs)
+                logger.info(f"Повідомлення доставлено: {label} → {chat_id}")
+                metrics.inc("notifications", result="sent")
+                return True
+
+            except TelegramRetryAfter as e:
+                logger.warning(f"Ліміт Telegram для {chat_id}, повтор через {e.retry_after} сек ({label})")
+                metrics.inc("notifications", result="retry_after")
+                bucket.block(e.retry_after)
+
+            except (TelegramNetworkError, TelegramServerError) as e:
+                metrics.inc("notifications", result="network_error")
+                delay = min(2 ** attempt, 60) + random.uniform(0, 1)
+                logger.warning(f"Помилка мережі при відправці {label}: {e}, повтор через {delay:.1f} сек")
+                await asyncio.sleep(delay)
+
+            except TelegramAPIError as e:
+                logger.error(f"Telegram відхилив повідомлення {label} для {chat_id}: {e}")
+                metrics.inc("notifications", result="rejected")
+                return False
+
+        metrics.inc("notifications", result="gave_up")
+        logger.error(f"Не вдалося доставити {label} у чат {chat_id} після {self.max_attempts} спроб")
+        return False
+
+    async def join(self, timeout: float | None = None):
+        waiters = [queue.join() for queue in self._queues.values()]
+        if waiters:
+            await asyncio.wait_for(asyncio.gather(*waiters), timeout)
+
+    async def close(self, timeout: float = 10):
+        try:
+            await self.join(timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не доставлено повідомлень при зупинці: {self.pending()}")
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
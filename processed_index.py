@@ -0,0 +1,130 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class ProcessedIndex:
+
+    def __init__(self, db, capacity: int, error_rate: float = 0.01,
+                 confirmed_size: int = 4096, sync_interval: float = 60):
+        self.db = db
+        self.capacity = capacity
+        self._bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self._hashes = max(1, round(self._bits / capacity * math.log(2)))
+        self._filter = bytearray((self._bits + 7) // 8)
+        self._confirmed = OrderedDict()
+        self._false_positives = OrderedDict()
+        self._confirmed_size = confirmed_size
+        self._sync_interval = sync_interval
+        self._last_sync = 0.0
+        self._last_id = 0
+        self._count = 0
+        self.warmed = False
+        self._lock = threading.Lock()
+
+    def _positions(self, key: str):
+        h1 = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h2 = hash((key, 1)) & 0xFFFFFFFFFFFFFFFF | 1
+        return [(h1 + i * h2) % self._bits for i in range(self._hashes)]
+
+    def _set(self, key: str):
+        for pos in self._positions(key):
+            self._filter[pos >> 3] |= 1 << (pos & 7)
+
+    def _test(self, key: str) -> bool:
+        return all(self._filter[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def _remember(self, cache: OrderedDict, file_path, file_hash):
+        key = (file_path, file_hash)
+        cache[key] = True
+        cache.move_to_end(key)
+        while len(cache) > self._confirmed_size:
+            cache.popitem(last=False)
+
+    def add(self, file_path, file_hash=None):
+        with self._lock:
+            self._set(f"p:{file_path}")
+            if file_hash:
+                self._set(f"h:{file_hash}")
+                self._remember(self._confirmed, file_path, file_hash)
+            self._false_positives.clear()
+
+    def _load(self, after_id: int) -> int:
+        loaded = 0
+        for row_id, file_path, file_hash in self.db.iter_processed_keys(after_id):
+            with self._lock:
+                self._set(f"p:{file_path}")
+                if file_hash:
+                    self._set(f"h:{file_hash}")
+                self._count += 1
+                self._last_id = max(self._last_id, row_id)
+            loaded += 1
+        if loaded:
+            with self._lock:
+                self._false_positives.clear()
+        return loaded
+
+    def warm(self):
+        started = time.perf_counter()
+        loaded = self._load(0)
+        self._last_sync = time.monotonic()
+        self.warmed = True
+        print(f"📚 Індекс оброблених файлів: {loaded} записів за {time.perf_counter() - started:.2f}s "
+              f"({len(self._filter) // 1024} КБ)")
+        if loaded > self.capacity:
+            print(f"⚠️ Записів більше за PROCESSED_INDEX_CAPACITY={self.capacity}, "
+                  f"частіше буде потрібна перевірка в БД")
+
+    def sync(self, force: bool = False):
+        if not force and time.monotonic() - self._last_sync < self._sync_interval:
+            return
+
+        max_id = self.db.get_processed_max_id()
+        self._last_sync = time.monotonic()
+
+        if max_id > self._last_id:
+            loaded = self._load(self._last_id)
+            if loaded:
+                print(f"🔄 Індекс оброблених файлів: +{loaded} записів з БД")
+
+    def filter_processed(self, file_paths, file_hashes=None) -> set:
+        file_paths = list(file_paths)
+        if file_hashes is None:
+            file_hashes = [self.db.get_file_hash(fp) for fp in file_paths]
+
+        processed = set()
+        suspects = []
+
+        with self._lock:
+            for fp, fh in zip(file_paths, file_hashes):
+                key = (fp, fh)
+                if key in self._confirmed:
+                    self._confirmed.move_to_end(key)
+                    processed.add(fp)
+                elif key in self._false_positives:
+                    self._false_positives.move_to_end(key)
+                elif self._test(f"p:{fp}") or self._test(f"h:{fh}"):
+                    suspects.append(key)
+
+        if suspects:
+            confirmed = self.db.get_processed_paths(
+                [fp for fp, _ in suspects], [fh for _, fh in suspects]
+            )
+            with self._lock:
+                for fp, fh in suspects:
+                    cache = self._confirmed if fp in confirmed else self._false_positives
+                    self._remember(cache, fp, fh)
+            processed |= confirmed
+
+        return processed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": self._count,
+                "capacity": self.capacity,
+                "memory_kb": len(self._filter) // 1024,
+                "confirmed": len(self._confirmed),
+                "last_id": self._last_id,
+            }
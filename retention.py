@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def default_archive_path(db_path: str) -> str:
+    path = Path(db_path)
+    return str(path.with_name(f"{path.stem}_archive{path.suffix or '.db'}"))
+
+
+class RetentionWorker:
+
+    def __init__(self, db, days: int, archive_path: str | None = None, interval: float = 86400,
+                 batch_size: int = 1000, vacuum_pages: int | None = None, pause: float = 0.05,
+                 initial_delay: float = 60):
+        self.db = db
+        self.days = days
+        self.archive_path = archive_path or default_archive_path(db.db_path)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.pause = pause
+        self.initial_delay = initial_delay
+        self.last_run = None
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+
+    def _run(self):
+        if self._stop.wait(self.initial_delay):
+            return
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Помилка обслуговування БД: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def prepare(self):
+        conn = self.db._connect()
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode == AUTO_VACUUM_INCREMENTAL:
+            return
+        started = time.perf_counter()
+        print("🧹 Переводимо БД на incremental vacuum, це одноразова операція...")
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        print(f"🧹 БД переведено на incremental vacuum за {time.perf_counter() - started:.1f}s")
+
+    def _ensure_schema(self, conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive.actions_log (
+                id INTEGER PRIMARY KEY,
+                file_name TEXT,
+                action TEXT,
+                user TEXT,
+                timestamp TEXT,
+                details TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive.processed_files (
+                id INTEGER PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                file_name TEXT,
+                file_hash TEXT,
+                processed_at TEXT,
+                approver TEXT,
+                status TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_archive_actions_timestamp ON actions_log(timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_archive_file_path ON processed_files(file_path)")
+        conn.execute("""
+            INSERT OR IGNORE INTO counters (name, value)
+            VALUES ('processed_files_archived', 0)
+        """)
+        conn.commit()
+
+    def _archive_actions(self, conn, cutoff: str) -> int:
+        moved = 0
+        while not self._stop.is_set():
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM actions_log WHERE timestamp < ? ORDER BY timestamp LIMIT ?",
+                (cutoff, self.batch_size)
+            )]
+            if not ids:
+                break
+
+            marks = ",".join("?" * len(ids))
+            with conn:
+                conn.execute(f"""
+                    INSERT INTO actions_monthly (month, action, user, count)
+                    SELECT substr(timestamp, 1, 7), COALESCE(action, ''), COALESCE(user, ''), COUNT(*)
+                    FROM actions_log WHERE id IN ({marks})
+                    GROUP BY 1, 2, 3
+                    ON CONFLICT(month, action, user) DO UPDATE SET count = count + excluded.count
+                """, ids)
+                conn.execute(f"INSERT OR IGNORE INTO archive.actions_log SELECT * FROM actions_log WHERE id IN ({marks})", ids)
+                conn.execute(f"DELETE FROM actions_log WHERE id IN ({marks})", ids)
+
+            moved += len(ids)
+            time.sleep(self.pause)
+        return moved
+
+    def _archive_processed(self, conn, cutoff: str) -> int:
+        moved = 0
+        last_id = 0
+        while not self._stop.is_set():
+            rows = conn.execute(
+                "SELECT id, file_path FROM processed_files WHERE id > ? AND processed_at < ? ORDER BY id LIMIT ?",
+                (last_id, cutoff, self.batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            ids = [row_id for row_id, file_path in rows if not os.path.exists(file_path)]
+            if ids:
+                marks = ",".join("?" * len(ids))
+                with conn:
+                    conn.execute(f"""
+                        INSERT OR IGNORE INTO archive.processed_files
+                        (id, file_path, file_name, file_hash, processed_at, approver, status)
+                        SELECT id, file_path, file_name, file_hash, processed_at, approver, status
+                        FROM processed_files WHERE id IN ({marks})
+                    """, ids)
+                    conn.execute(f"DELETE FROM processed_files WHERE id IN ({marks})", ids)
+                    conn.execute(
+                        "UPDATE counters SET value = value + ? WHERE name = 'processed_files_archived'",
+                        (len(ids),)
+                    )
+                moved += len(ids)
+
+            time.sleep(self.pause)
+        return moved
+
+    def _incremental_vacuum(self, conn) -> int:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            return 0
+
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        budget = free if self.vacuum_pages is None else min(self.vacuum_pages, free)
+        freed = 0
+        while freed < budget and not self._stop.is_set():
+            step = min(budget - freed, self.batch_size)
+            conn.executescript(f"PRAGMA incremental_vacuum({int(step)});")
+            left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if left >= free:
+                break
+            freed += free - left
+            free = left
+            time.sleep(self.pause)
+        return freed
+
+    def run_once(self) -> dict:
+        started = time.perf_counter()
+        cutoff = (datetime.now() - timedelta(days=self.days)).isoformat()
+        conn = self.db._connect()
+
+        conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        try:
+            self._ensure_schema(conn)
+            actions = self._archive_actions(conn, cutoff)
+            processed = self._archive_processed(conn, cutoff)
+        finally:
+            conn.execute("DETACH DATABASE archive")
+
+        pages = self._incremental_vacuum(conn)
+
+        self.last_run = datetime.now()
+        self.last_result = {
+            "actions_archived": actions,
+            "processed_archived": processed,
+            "pages_freed": pages,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        if actions or processed or pages:
+            print(f"🗄️ Архівовано: дій {actions}, файлів {processed}; звільнено сторінок {pages} "
+                  f"({self.last_result['seconds']}s)")
+        return self.last_result
@@ -0,0 +1,100 @@
+import time
+from datetime import datetime
+
+
+class ScanScheduler:
+
+    def __init__(self, floor: float, ceiling: float, backoff: float = 2.0,
+                 business_hours: tuple | None = None, business_days=frozenset(range(1, 6)),
+                 business_interval: float | None = None):
+        self.floor = floor
+        self.ceiling = max(ceiling, floor)
+        self.backoff = max(backoff, 1.0)
+        self.business_hours = business_hours
+        self.business_days = business_days
+        self.business_interval = max(business_interval or self.ceiling, floor)
+        self._folders = {}
+
+    def in_business_hours(self, now: float | None = None) -> bool:
+        if self.business_hours is None:
+            return False
+        moment = datetime.fromtimestamp(time.time() if now is None else now)
+        if moment.isoweekday() not in self.business_days:
+            return False
+        minute = moment.hour * 60 + moment.minute
+        start, end = self.business_hours
+        if start <= end:
+            return start <= minute < end
+        return minute >= start or minute < end
+
+    def limit(self, now: float | None = None) -> float:
+        if self.in_business_hours(now):
+            return min(self.ceiling, self.business_interval)
+        return self.ceiling
+
+    def _state(self, folder: str, label: str | None = None) -> dict:
+        state = self._folders.get(folder)
+        if state is None:
+            state = {
+                "label": label or folder,
+                "interval": self.floor,
+                "next_due": 0.0,
+                "last_scan": None,
+                "last_activity": None,
+                "scans": 0,
+            }
+            self._folders[folder] = state
+        elif label:
+            state["label"] = label
+        return state
+
+    def due(self, folder: str, now: float | None = None) -> bool:
+        state = self._folders.get(folder)
+        if state is None:
+            return True
+        now = time.time() if now is None else now
+        limit = self.limit(now)
+        if state["interval"] > limit:
+            state["interval"] = limit
+            state["next_due"] = min(state["next_due"], (state["last_scan"] or now) + limit)
+        return now >= state["next_due"]
+
+    def record(self, folder: str, activity: bool, now: float | None = None, label: str | None = None):
+        now = time.time() if now is None else now
+        state = self._state(folder, label)
+        if activity:
+            state["interval"] = self.floor
+            state["last_activity"] = now
+        elif state["scans"]:
+            state["interval"] = min(state["interval"] * self.backoff, self.limit(now))
+        state["last_scan"] = now
+        state["next_due"] = now + state["interval"]
+        state["scans"] += 1
+
+    def forget(self, folder: str):
+        self._folders.pop(folder, None)
+
+    def next_delay(self, folders=None, now: float | None = None) -> float | None:
+        now = time.time() if now is None else now
+        limit = self.limit(now)
+        delays = []
+        for folder in self._folders if folders is None else folders:
+            state = self._folders.get(folder)
+            if state is None:
+                return 0.0
+            due_at = min(state["next_due"], (state["last_scan"] or now) + limit)
+            delays.append(due_at - now)
+        return max(min(delays), 0.0) if delays else None
+
+    def snapshot(self, now: float | None = None) -> list:
+        now = time.time() if now is None else now
+        return [
+            {
+                "folder": folder,
+                "label": state["label"],
+                "interval": state["interval"],
+                "next_in": max(state["next_due"] - now, 0.0),
+                "idle_for": None if state["last_activity"] is None else now - state["last_activity"],
+            }
+            for folder, state in self._folders.items()
+        ]
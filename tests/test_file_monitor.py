@@ -0,0 +1,83 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime, time
+from pathlib import Path
+
+from openpyxl import Workbook
+
+import config
+from database import Database
+from excel_handler import ExcelHandler
+from file_monitor import FileMonitor
+
+FOLDERS = ("director_folder", "findirector_folder", "accountant_folder", "cashier_folder", "rejected_folder")
+
+
+def _make(path: Path, supplier="ТОВ Ромашка", applicant="Петренко"):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Бланк"
+    ws["B1"] = datetime(2025, 3, 14)
+    ws["B1"].number_format = "dd.mm.yyyy"
+    ws["E1"] = applicant
+    ws["H1"] = "Продажі"
+    ws["C3"] = "Готівка"
+    ws["G4"] = supplier
+    ws["B10"] = 1500.5
+    ws["C12"] = "Оплата"
+    wb.create_sheet("Налаштування")["B8"] = "Director_confirm_form"
+    wb.save(path)
+
+
+class DateCellsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.paths = {key: str(self.root / key) for key in FOLDERS}
+        for path in self.paths.values():
+            Path(path).mkdir()
+        self.saved = config._paths, config.FILE_SETTLE_TIME
+        config._paths = self.paths
+        config.FILE_SETTLE_TIME = 0
+
+    def tearDown(self):
+        config._paths, config.FILE_SETTLE_TIME = self.saved
+        self._tmp.cleanup()
+
+    def test_read_application_is_serializable(self):
+        path = self.root / "date.xlsx"
+        _make(path, supplier=datetime(2025, 3, 14), applicant=time(9, 30))
+        excel = ExcelHandler(workers=1)
+        try:
+            data = excel.read_application(str(path))
+        finally:
+            excel.shutdown()
+
+        self.assertEqual(data["постачальник"], "2025-03-14 00:00:00")
+        self.assertEqual(data["заявник"], "09:30:00")
+        json.dumps(data)
+
+    def test_scan_persists_workbook_with_date_cells(self):
+        folder = Path(self.paths["director_folder"])
+        _make(folder / "date.xlsx", supplier=datetime(2025, 3, 14))
+        _make(folder / "plain.xlsx")
+
+        monitor = FileMonitor(excel=ExcelHandler(workers=1), db=Database(str(self.root / "test.db")))
+        try:
+            apps = []
+            for _ in range(2):
+                monitor._last_full_scan = 0.0
+                apps += monitor.check_folders()
+
+            self.assertEqual(sorted(app["file_name"] for app in apps), ["date.xlsx", "plain.xlsx"])
+            self.assertEqual(monitor.pending_files, {})
+            unsent = monitor.db.get_unsent_applications()
+            self.assertEqual(len(unsent), 2)
+        finally:
+            monitor.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+
+import xlsx_reader
+
+VALUES = [0, 0.5, 0.25, 0.999999, 0.9999999999, 1, 1.5, 59, 59.75, 60, 61, 45000.123456789, 45000.5000001, 2958465.9999]
+FORMATS = [
+    "General", "0.00", "0.00%", "dd.mm.yyyy", "h:mm", "h:mm:ss", "mm:ss", "[h]:mm:ss", "[mm]:ss",
+    "yyyy-mm-dd hh:mm:ss", "yyyy-mm-dd hh:mm:ss.000", '"day "0', "[Red]0.00", "[$-409]d-mmm-yy",
+    "mm-dd-yy", "m/d/yy h:mm", "mmss.0", r"\d0",
+]
+TEXTS = ["Продажі", "  з пробілами  ", "", "=не формула", "1e5"]
+
+
+def _build(path: Path, date1904: bool = False):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Бланк"
+    if date1904:
+        wb.epoch = xlsx_reader.EPOCH_1904
+    refs = []
+    row = 1
+    for number_format in FORMATS:
+        for col, value in enumerate(VALUES, start=1):
+            cell = ws.cell(row=row, column=col, value=value)
+            cell.number_format = number_format
+            refs.append(cell.coordinate)
+        row += 1
+    for col, value in enumerate(TEXTS + [True, False, datetime(2025, 3, 14, 9, 30)], start=1):
+        refs.append(ws.cell(row=row, column=col, value=value).coordinate)
+    refs.append("Z999")
+    wb.save(path)
+    return refs
+
+
+class XlsxReaderParityTest(unittest.TestCase):
+
+    def assert_parity(self, date1904: bool):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "parity.xlsx"
+            refs = _build(path, date1904)
+
+            fast = xlsx_reader.read_cells(str(path), {"Бланк": refs, "Немає": ["A1"]})
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                ws = load_workbook(path, data_only=True)["Бланк"]
+
+            self.assertEqual(fast["sheetnames"], ["Бланк"])
+            for ref in refs:
+                expected = ws[ref].value
+                actual = fast["cells"][f"Бланк!{ref}"]
+                with self.subTest(ref=ref, number_format=ws[ref].number_format):
+                    self.assertEqual(type(actual), type(expected))
+                    self.assertEqual(actual, expected)
+
+    def test_matches_openpyxl(self):
+        self.assert_parity(date1904=False)
+
+    def test_matches_openpyxl_1904(self):
+        self.assert_parity(date1904=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,301 @@
+import posixpath
+import re
+import zipfile
+from datetime import datetime, time, timedelta
+from xml.etree.ElementTree import iterparse
+
+
+class XlsxReadError(Exception):
+    pass
+
+
+BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+BUILTIN_TIMEDELTA_FORMATS = {46}
+
+EPOCH_1900 = datetime(1899, 12, 30)
+EPOCH_1904 = datetime(1904, 1, 1)
+
+_CELL_REF = re.compile(r"^\$?([A-Za-z]{1,3})\$?(\d+)$")
+_FORMAT_NOISE = re.compile(r'".*?"|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+_TIMEDELTA = re.compile(r'\[hh?\](:mm(:ss(\.0*)?)?)?|\[mm?\](:ss(\.0*)?)?|\[ss?\](\.0*)?', re.IGNORECASE)
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _attr(elem, name: str):
+    for key, value in elem.attrib.items():
+        if _local(key) == name:
+            return value
+    return None
+
+
+def _text(elem) -> str:
+    parts = []
+    for node in elem.iter():
+        tag = _local(node.tag)
+        if tag == "rPh":
+            break
+        if tag == "t" and node.text:
+            parts.append(node.text)
+    return "".join(parts)
+
+
+def _split_ref(ref: str) -> tuple:
+    match = _CELL_REF.match(ref)
+    if not match:
+        raise XlsxReadError(f"Некоректна адреса клітинки: {ref}")
+    col = 0
+    for ch in match.group(1).upper():
+        col = col * 26 + ord(ch) - 64
+    return int(match.group(2)), col
+
+
+def _resolve_target(base: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+
+def _read_rels(archive, part: str) -> dict:
+    rels_path = posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+    rels = {}
+    try:
+        with archive.open(rels_path) as fh:
+            for _, elem in iterparse(fh):
+                if _local(elem.tag) == "Relationship":
+                    rels[elem.get("Id")] = (
+                        elem.get("Type", "").rsplit("/", 1)[-1],
+                        _resolve_target(part, elem.get("Target", "")),
+                    )
+    except KeyError:
+        pass
+    return rels
+
+
+def _workbook_part(archive) -> str:
+    for rel_type, target in _read_rels(archive, "").values():
+        if rel_type == "officeDocument":
+            return target
+    return "xl/workbook.xml"
+
+
+def is_date_format(code: str | None) -> bool:
+    if not code:
+        return False
+    cleaned = _FORMAT_NOISE.sub("", code.split(";", 1)[0])
+    return re.search(r"(?<!\\)[dmhys]", cleaned, re.IGNORECASE) is not None
+
+
+def is_timedelta_format(code: str | None) -> bool:
+    if not code:
+        return False
+    return _TIMEDELTA.search(code.split(";", 1)[0]) is not None
+
+
+def from_excel(value: float, epoch: datetime, as_timedelta: bool = False):
+    if as_timedelta:
+        result = timedelta(days=value)
+        if result.microseconds:
+            result = timedelta(seconds=result.total_seconds() // 1, microseconds=round(result.microseconds, -3))
+        return result
+
+    day, fraction = divmod(value, 1)
+    diff = timedelta(milliseconds=round(fraction * 86400 * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        minutes, seconds = divmod(diff.seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return time(hours, minutes, seconds, diff.microseconds)
+    if epoch is EPOCH_1900 and 0 < value < 60:
+        day += 1
+    return epoch + timedelta(days=day) + diff
+
+
+class _Styles:
+
+    def __init__(self, archive, part: str | None):
+        self.formats = {}
+        self.xf_formats = []
+        if part is None:
+            return
+        try:
+            with archive.open(part) as fh:
+                in_cell_xfs = False
+                for event, elem in iterparse(fh, events=("start", "end")):
+                    tag = _local(elem.tag)
+                    if tag == "cellXfs":
+                        in_cell_xfs = event == "start"
+                    elif event == "end" and tag == "numFmt":
+                        self.formats[int(elem.get("numFmtId"))] = elem.get("formatCode")
+                    elif event == "end" and tag == "xf" and in_cell_xfs:
+                        self.xf_formats.append(int(elem.get("numFmtId", 0)))
+        except KeyError:
+            pass
+
+    def kind(self, style_index: int) -> str | None:
+        if style_index >= len(self.xf_formats):
+            return None
+        fmt_id = self.xf_formats[style_index]
+        code = self.formats.get(fmt_id)
+        if code is None:
+            if fmt_id in BUILTIN_TIMEDELTA_FORMATS:
+                return "timedelta"
+            return "date" if fmt_id in BUILTIN_DATE_FORMATS else None
+        if not is_date_format(code):
+            return None
+        return "timedelta" if is_timedelta_format(code) else "date"
+
+
+def _read_shared_strings(archive, part: str | None, indices: set) -> dict:
+    if not indices:
+        return {}
+    if part is None:
+        raise XlsxReadError("Немає sharedStrings.xml")
+
+    strings = {}
+    last = max(indices)
+    position = 0
+    with archive.open(part) as fh:
+        for _, elem in iterparse(fh):
+            if _local(elem.tag) != "si":
+                continue
+            if position in indices:
+                strings[position] = _text(elem)
+            elem.clear()
+            if position >= last:
+                break
+            position += 1
+
+    missing = indices - strings.keys()
+    if missing:
+        raise XlsxReadError(f"Немає рядків {sorted(missing)} у sharedStrings.xml")
+    return strings
+
+
+def _scan_sheet(archive, part: str, refs) -> dict:
+    wanted = {_split_ref(ref): ref for ref in refs}
+    max_row = max(row for row, _ in wanted)
+    found = {}
+
+    row_idx = 0
+    col_idx = 0
+    with archive.open(part) as fh:
+        for event, elem in iterparse(fh, events=("start", "end")):
+            tag = _local(elem.tag)
+
+            if event == "start":
+                if tag == "row":
+                    row_idx = int(elem.get("r") or row_idx + 1)
+                    col_idx = 0
+                    if row_idx > max_row:
+                        break
+                continue
+
+            if tag == "c":
+                ref = elem.get("r")
+                if ref:
+                    row_idx, col_idx = _split_ref(ref)
+                else:
+                    col_idx += 1
+                key = wanted.get((row_idx, col_idx))
+                if key is not None:
+                    value = None
+                    inline = None
+                    for child in elem:
+                        child_tag = _local(child.tag)
+                        if child_tag == "v":
+                            value = child.text
+                        elif child_tag == "is":
+                            inline = _text(child)
+                    found[key] = (elem.get("t", "n"), elem.get("s"), value, inline)
+                elem.clear()
+                if len(found) == len(wanted):
+                    break
+            elif tag == "row":
+                elem.clear()
+            elif tag == "sheetData":
+                break
+
+    return found
+
+
+def _convert(raw, shared: dict, styles, epoch: datetime):
+    cell_type, style, value, inline = raw
+
+    if cell_type == "inlineStr":
+        return inline
+    if value is None:
+        return None
+    if cell_type == "s":
+        return shared[int(value)]
+    if cell_type in ("str", "e"):
+        return value
+    if cell_type == "b":
+        return value.strip() == "1"
+    if cell_type == "d":
+        return datetime.fromisoformat(value.rstrip("Z"))
+
+    number = float(value) if any(ch in value for ch in ".eE") else int(value)
+    if style is not None:
+        kind = styles().kind(int(style))
+        if kind is not None:
+            try:
+                return from_excel(number, epoch, as_timedelta=kind == "timedelta")
+            except (OverflowError, ValueError):
+                return "#VALUE!"
+    return number
+
+
+def read_cells(file_path, cells: dict) -> dict:
+    try:
+        archive = zipfile.ZipFile(file_path)
+    except zipfile.BadZipFile as e:
+        raise XlsxReadError(f"Не zip-архів: {e}") from e
+
+    with archive:
+        workbook_part = _workbook_part(archive)
+        sheets = {}
+        epoch = EPOCH_1900
+
+        with archive.open(workbook_part) as fh:
+            for _, elem in iterparse(fh):
+                tag = _local(elem.tag)
+                if tag == "sheet":
+                    sheets[elem.get("name")] = _attr(elem, "id")
+                elif tag == "workbookPr" and elem.get("date1904") in ("1", "true"):
+                    epoch = EPOCH_1904
+
+        rels = _read_rels(archive, workbook_part)
+        by_type = {rel_type: target for rel_type, target in rels.values()}
+
+        raw_cells = {}
+        for sheet_name, refs in cells.items():
+            if sheet_name not in sheets:
+                continue
+            rel = rels.get(sheets[sheet_name])
+            if rel is None:
+                raise XlsxReadError(f"Немає зв'язку для аркуша {sheet_name}")
+            found = _scan_sheet(archive, rel[1], refs)
+            for ref in refs:
+                raw_cells[f"{sheet_name}!{ref}"] = found.get(ref)
+
+        shared_indices = {
+            int(raw[2]) for raw in raw_cells.values()
+            if raw is not None and raw[0] == "s" and raw[2] is not None
+        }
+        shared = _read_shared_strings(archive, by_type.get("sharedStrings"), shared_indices)
+
+        styles_cache = []
+
+        def styles():
+            if not styles_cache:
+                styles_cache.append(_Styles(archive, by_type.get("styles")))
+            return styles_cache[0]
+
+        values = {
+            key: None if raw is None else _convert(raw, shared, styles, epoch)
+            for key, raw in raw_cells.items()
+        }
+
+    return {"sheetnames": list(sheets), "cells": values}